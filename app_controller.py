@@ -5,11 +5,22 @@ import subprocess
 import sys
 import json
 import logging
+import re
+import codecs
 from datetime import datetime
+import numpy as np
 from data_model import DataModel
 from i18n import translator, get_translator
-import chardet
-from utils import detect_delimiter
+from utils import detect_delimiter, detect_file_encoding, DELIMITER_MIN_CONFIDENCE
+from job_runner import JobRunner
+from instrumentation import TimingSpan
+from recipes import Recipe, run_batch, INPUT_EXTENSIONS
+from multi_file import merge_files
+from find_replace import build_pattern, is_text_dtype
+from stream_processor import read_first_chunk, stream_clean_file
+from profiling import profile_column
+from search_index import build_search_strings, match_rows
+from sort_index import build_sort_key, sort_permutation, filter_permutation
 
 EXAMPLE_DATA = """ID|Name|Age|City
 1|Alice|30|New York
@@ -20,6 +31,11 @@ EXAMPLE_DATA = """ID|Name|Age|City
 4|Eve|28|Houston
 """
 
+# Dropped files are parsed straight from disk; the textbox only shows their head
+FILE_HEAD_BYTES = 64 * 1024
+FILE_HEAD_LINES = 200
+FILE_READ_CHUNK_BYTES = 1024 * 1024
+
 class AppController:
     CONFIG_FILE = "config.json"
 
@@ -27,34 +43,220 @@ class AppController:
         self.model = model
         self.view = view
         self._ = get_translator().get
+        self.jobs = JobRunner(view, on_activity=self._on_job_activity)
+        # Column profiling gets its own single worker so it never holds up parses and data ops;
+        # pending columns show as placeholders in the panel instead of in the status bar
+        self.profile_jobs = JobRunner(view, max_workers=1)
+        self._last_parse_request = None
+        self._source_file = None # (path, encoding, head_text) while a dropped file is the parse source
+        self._chunked_source = None # (path, encoding, settings) while the preview is only the first chunk of that file
+        self._merge_sources = None # Paths while several dropped files are merged into one table
+        self._last_text_parse = None # (text, settings, df) of the last full-text parse, for parse_appended
+        self._pending_parse = None # Parse result waiting for the running data op or export to finish
+        self._last_search = None # (query, scope, regex, column tokens, matching rows) of the filter shown in the preview
+        self._sort_keys = [] # (column position, ascending) of the preview sort, most significant first
+        self._sort_columns = None # Columns of the frame the sort positions refer to
+        self._row_order_shown = False
+        self._profile_op = "" # Op named by the profile_op config key; it runs under cProfile
+
+    def _read_parse_settings(self):
+        try:
+            delimiter = self.view.delimiter_var.get()
+            if delimiter == '\\t': delimiter = '\t'
+            header_row = int(self.view.header_row_var.get() or 0)
+            skip_rows = int(self.view.skip_rows_var.get() or 0)
+            quote_char_val = self.view.quote_char_var.get()
+            quote_char = None if quote_char_val == self._("no_quote_char") else quote_char_val
+        except (ValueError, TypeError):
+             self.log_and_update_status(self._("log_error_invalid_settings"), level="error")
+             return None
+        return delimiter, header_row, skip_rows, quote_char
+
+    def _submit_timed(self, kind, op, func, df=None, on_success=None, **options):
+        """
+        Submits func(job, span) as a job inside a TimingSpan named op. The span is logged when the job
+        ends and its duration shown in the status bar once the result is delivered.
+        """
+        spans = []
+        def run(job):
+            with TimingSpan(op, df, profile=op == self._profile_op) as span:
+                spans.append(span)
+                return func(job, span)
+        def finished(result):
+            if spans:
+                self.view.show_last_op(self._("status_last_op").format(op=op, duration=spans[0].duration_text()))
+            on_success(result)
+        return self.jobs.submit(kind, run, on_success=finished, on_error=self._on_job_failed, **options)
+
+    def _submit_parse(self, parse_request, op, parse, on_parsed=None):
+        # Settings writes (including our own delimiter write-back) re-arm the debounce;
+        # if the effective request is unchanged there is nothing to do. Explicit loads and
+        # data ops reset _last_parse_request, so only these debounce repeats are skipped
+        if parse_request == self._last_parse_request:
+            return
+        self._last_parse_request = parse_request
+        # A newer parse always supersedes one that is still running
+        def timed_parse(job, span):
+            result = parse(job)
+            span.set_output(result[2])
+            return result
+        def finished(result):
+            # Only the newest parse is delivered, on the UI thread
+            if on_parsed is not None:
+                on_parsed(result)
+            self._on_parse_finished(result)
+        self._submit_timed("parse", op, timed_parse, on_success=finished, label=self._("job_parse"), supersede=True)
 
     def process_input_data(self):
+        if self._merge_sources is not None or self._source_file is not None:
+            self._last_text_parse = None # Do not keep a frame alive for text that is no longer parsed
+        if self._merge_sources is not None:
+            self._process_merge_sources()
+            return
+        if self._source_file is not None:
+            self._process_source_file()
+            return
+        self._chunked_source = None
+
         input_text = self.view.textbox.get("1.0", "end-1c")
         
         if input_text.strip():
-            try:
-                delimiter = self.view.delimiter_var.get()
-                if delimiter == '\\t': delimiter = '\t'
-                header_row = int(self.view.header_row_var.get() or 0)
-                skip_rows = int(self.view.skip_rows_var.get() or 0)
-                quote_char_val = self.view.quote_char_var.get()
-                quote_char = None if quote_char_val == self._("no_quote_char") else quote_char_val
-            except (ValueError, TypeError):
-                 self.log_and_update_status(self._("log_error_invalid_settings"), level="error")
-                 return
-            success, message = self.model.load_data_from_string(input_text, delimiter, header_row, skip_rows, quote_char)
-            
-            detected_delimiter = detect_delimiter(input_text)
-            if detected_delimiter:
-                ui_delimiter = '\\t' if detected_delimiter == '\t' else detected_delimiter
-                self.view.delimiter_var.set(ui_delimiter)
+            settings = self._read_parse_settings()
+            if settings is None:
+                return
+
+            compact = self.view.compact_dtypes_var.get()
+            previous = self._last_text_parse
+
+            def parse(job):
+                result = None
+                # Edits at the end of the text only reparse the lines from the first changed one
+                if not compact and previous is not None and previous[1] == settings:
+                    result = self.model.parse_appended(previous[0], previous[2], input_text, *settings)
+                if result is None:
+                    result = self.model.parse_string(input_text, *settings, compact=compact)
+                return result + (detect_delimiter(input_text),)
+
+            def remember(result):
+                success, _, df, _ = result
+                if success and not compact:
+                    # A shallow copy: copy-on-write keeps it unchanged by later edits to the model's frame
+                    self._last_text_parse = (input_text, settings, df.copy(deep=False))
+
+            self._submit_parse((input_text, compact) + settings, "parse_string", parse, on_parsed=remember)
         else:
+            self.jobs.cancel("parse")
+            self._last_parse_request = None
+            self._pending_parse = None
+            self._last_text_parse = None
             self.model.clear_data()
-            message = self._("status_ready")
+            self.view.update_preview(self.model.df)
+            self.refresh_profile()
+            self.refresh_row_order()
+            self.log_and_update_status(self._("status_ready"))
+
+    def _process_source_file(self):
+        file_path, encoding, head_text = self._source_file
+        settings = self._read_parse_settings()
+        if settings is None:
+            return
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            self.log_and_update_status(self._("log_error_job_failed").format(e=e), level="error")
+            return
+
+        compact = self.view.compact_dtypes_var.get()
+        chunked = encoding is not None and self.view.chunked_mode_var.get()
+        self._chunked_source = (file_path, encoding, settings) if chunked else None
+
+        if chunked:
+            def parse(job):
+                return read_first_chunk(file_path, encoding, *settings) + (detect_delimiter(head_text),)
+            self._submit_parse((file_path, stat.st_mtime_ns, stat.st_size, encoding, 'chunked') + settings, "read_first_chunk", parse)
+            return
+
+        if encoding is None: # Columnar file
+            def parse(job):
+                return self.model.parse_columnar_file(file_path, compact=compact) + (('', 0.0),)
+            self._submit_parse((file_path, stat.st_mtime_ns, stat.st_size, compact), "parse_columnar_file", parse)
+            return
+
+        def parse(job):
+            success, message, df = self.model.parse_file(file_path, encoding, *settings, sample=head_text, compact=compact)
+            return success, message, df, detect_delimiter(head_text)
+
+        self._submit_parse((file_path, stat.st_mtime_ns, stat.st_size, encoding, compact) + settings, "parse_file", parse)
+
+    def _process_merge_sources(self):
+        """
+        Parses every merged file on its own thread, detecting its encoding and delimiter; the delimiter
+        setting is only used for files where the detection is not confident.
+        """
+        settings = self._read_parse_settings()
+        if settings is None:
+            return
+        paths = self._merge_sources
+        try:
+            stats = tuple((stat.st_mtime_ns, stat.st_size) for stat in map(os.stat, paths))
+        except OSError as e:
+            self.log_and_update_status(self._("log_error_job_failed").format(e=e), level="error")
+            return
+
+        self._chunked_source = None # Chunked mode only applies to a single dropped file
+        compact = self.view.compact_dtypes_var.get()
+        intersection = self.view.merge_intersection_var.get()
+        source_column = self.view.merge_source_column_var.get()
+        delimiter, header_row, skip_rows, quote_char = settings
+        load_settings = {"default_delimiter": delimiter, "header_row": header_row, "skip_rows": skip_rows, "quote_char": quote_char}
+
+        def parse(job):
+            return merge_files(paths, load_settings, intersection, source_column, compact, progress=job.report_progress) + (('', 0.0),)
+
+        self._submit_parse((tuple(paths), stats, compact, intersection, source_column) + settings, "merge_files", parse)
 
+    def _on_parse_finished(self, result):
+        if self.jobs.is_busy("data", "export"):
+            # A data op or export is still working on the current table; swap it out once they are done
+            if self._pending_parse is None:
+                self.view.after(JobRunner.POLL_INTERVAL_MS, self._deliver_pending_parse)
+            self._pending_parse = result
+            return
+        success, message, df, (detected_delimiter, confidence) = result
+        if success:
+            self.model.set_dataframe(df)
+        # A low-confidence guess must never flip the user's delimiter
+        if confidence >= DELIMITER_MIN_CONFIDENCE:
+            ui_delimiter = '\\t' if detected_delimiter == '\t' else detected_delimiter
+            if ui_delimiter != self.view.delimiter_var.get():
+                self.view.delimiter_var.set(ui_delimiter)
         self.view.update_preview(self.model.df)
-        if 'message' in locals():
-            self.log_and_update_status(message)
+        self.refresh_profile()
+        self.refresh_row_order()
+        self.log_and_update_status(message)
+
+    def _deliver_pending_parse(self):
+        result, self._pending_parse = self._pending_parse, None
+        if result is not None:
+            self._on_parse_finished(result)
+
+    def _on_job_failed(self, error):
+        self.log_and_update_status(self._("log_error_job_failed").format(e=error), level="error")
+
+    def _on_job_activity(self, jobs):
+        if jobs:
+            self.view.show_job_progress(", ".join(job.label for job in jobs if job.label), jobs[0].progress)
+        else:
+            self.view.hide_job_progress()
+
+    def on_cancel_jobs(self):
+        if self.jobs.is_busy():
+            self.jobs.cancel()
+            self.log_and_update_status(self._("log_info_jobs_cancelled"))
+
+    def shutdown(self):
+        self.jobs.shutdown()
+        self.profile_jobs.shutdown()
 
     def log_and_update_status(self, message: str, level: str = "info"):
         if level == "info": logging.info(message)
@@ -63,14 +265,35 @@ class AppController:
         self.view.add_history(f"[{timestamp}] {message}")
         self.view.update_status(message)
 
-    def _run_data_op(self, operation, *args):
-        if self.model.df.empty:
+    def _run_data_op(self, operation, *args, require_data=True):
+        if require_data and self.model.df.empty:
             self.log_and_update_status(self._("log_error_no_data_op"), level="error")
             return
-        message = operation(*args)
-        self.view.update_preview(self.model.df)
+        if self.jobs.is_busy("data", "export"):
+            self.log_and_update_status(self._("log_error_job_busy"), level="error")
+            return
+        def run(job, span):
+            message, state = self.model.run_staged(operation, *args)
+            span.set_output(state.df)
+            return message, state
+
+        # Ops work on a staged copy that only replaces the model's state once they finish, so there is
+        # no partial result to fall back to: once started they run to completion
+        self._submit_timed("data", operation.__name__, run, self.model.df, on_success=self._on_data_op_finished, label=self._("job_data_op"), cancellable=False)
+
+    def _on_data_op_finished(self, result):
+        message, state = result
+        self.model.commit(state)
+        change = state.last_change
+        if change is not None:
+            self._last_parse_request = None # The table no longer matches that parse
+        self.view.apply_preview_change(self.model.df, change)
+        self.refresh_profile()
+        self.refresh_row_order(keep_offset=True)
         self.log_and_update_status(message)
 
+    def on_undo(self): self._run_data_op(self.model.undo, require_data=False)
+    def on_redo(self): self._run_data_op(self.model.redo, require_data=False)
     def on_remove_empty_rows(self): self._run_data_op(self.model.remove_empty_rows)
     def on_remove_duplicate_rows(self): self._run_data_op(self.model.remove_duplicate_rows)
     def on_normalize_column_names(self): self._run_data_op(self.model.normalize_column_names)
@@ -82,12 +305,20 @@ class AppController:
             return
         self._run_data_op(self.model.fill_na_global, fill_value)
 
+    def _chunked_edit_blocked(self):
+        # Edits tied to rows of the first chunk cannot be replayed over the whole file on export
+        if self._chunked_source is None:
+            return False
+        self.log_and_update_status(self._("log_error_chunked_edit"), level="error")
+        return True
+
     def on_delete_selected_rows(self):
-        selected_items = self.view.tree.selection()
-        if not selected_items:
+        if self._chunked_edit_blocked():
+            return
+        indices_to_delete = self.view.get_selected_row_positions()
+        if not indices_to_delete:
             self.log_and_update_status(self._("log_error_no_rows_selected"), level="error")
             return
-        indices_to_delete = [self.view.tree.index(item) for item in selected_items]
         self._run_data_op(self.model.delete_rows_by_indices, indices_to_delete)
 
     def on_manage_columns(self):
@@ -113,53 +344,479 @@ class AppController:
         ctk.CTkButton(button_frame, text=self._("cancel_button"), command=toplevel.destroy).pack(side="left", padx=10)
         ctk.CTkButton(button_frame, text=self._("apply_button"), command=apply_changes).pack(side="left", padx=10)
 
+    def on_toggle_profile(self):
+        self.view.toggle_profile_panel()
+        self.refresh_profile()
+
+    def refresh_profile(self):
+        """
+        Shows cached column stats at once and profiles the missing columns in the background, one job per column.
+        """
+        if not self.view.profile_panel_visible():
+            return
+        self.profile_jobs.cancel()
+        df = self.model.df
+        self.model.profiles.sync(df.shape[1])
+        cached = [self.model.profiles.get(i) for i in range(df.shape[1])]
+        self.view.show_profile(list(df.columns), [stats for stats, _ in cached])
+        for position, (stats, token) in enumerate(cached):
+            if stats is None:
+                # pandas copy-on-write: the column snapshot is unaffected by later in-place ops
+                column = df.iloc[:, position]
+                self.profile_jobs.submit("profile", lambda job, column=column: profile_column(column), on_success=lambda stats, token=token: self._on_column_profiled(token, stats), on_error=self._on_job_failed)
+
+    def _on_column_profiled(self, token, stats):
+        position = self.model.profiles.put(token, stats)
+        if position is not None:
+            self.view.update_profile_row(position, stats)
+
+    def on_search(self):
+        self.refresh_row_order()
+
+    def on_sort_column(self, position: int, extend: bool = False):
+        """
+        A heading click sorts by that column, ascending, then descending, then unsorted.
+        With extend (Shift-click) the column is added to the sort as a further key.
+        """
+        keys = dict(self._sort_keys)
+        if not extend and list(keys) != [position]:
+            keys = {}
+        ascending = keys.get(position)
+        if ascending is None:
+            keys[position] = True
+        elif ascending:
+            keys[position] = False
+        else:
+            keys.pop(position, None)
+        # Dicts keep insertion order, so the first column clicked stays the most significant key
+        self._sort_keys = list(keys.items())
+        self._sort_columns = list(self.model.df.columns)
+        self.view.set_sort_indicators(self._sort_keys)
+        self.refresh_row_order()
+
+    def refresh_row_order(self, keep_offset=False):
+        """
+        Filters the preview to the rows matching the search box and orders it by the sort keys, in the
+        background. Per-column search text and sort permutations are built once and cached in the model;
+        extending a literal query only searches the rows that matched before. The DataFrame itself is
+        never copied or reordered: the preview shows it through the resulting row order.
+        """
+        query, scope, use_regex = self.view.get_search()
+        df = self.model.df
+        if self._sort_keys and list(df.columns) != self._sort_columns:
+            # Column positions moved; the sort no longer refers to the same columns
+            self._sort_keys = []
+            self.view.set_sort_indicators([])
+        if df.empty or (not query and not self._sort_keys):
+            self.jobs.cancel("row_order")
+            self._last_search = None
+            if self._row_order_shown:
+                self._row_order_shown = False
+                self.view.set_row_order(None, keep_offset=keep_offset)
+            return
+        if query and use_regex:
+            try:
+                re.compile(query)
+            except re.error as e:
+                self.log_and_update_status(self._("log_error_invalid_regex").format(e=e), level="error")
+                return
+
+        # Missing columns are snapshotted here; copy-on-write keeps them unaffected by later in-place ops
+        search_columns, sort_columns = [], []
+        if query:
+            self.model.search_strings.sync(df.shape[1])
+            for position in (range(df.shape[1]) if scope is None else [scope]):
+                strings, token = self.model.search_strings.get(position)
+                search_columns.append((token, strings, df.iloc[:, position] if strings is None else None))
+        self.model.sort_keys.sync(df.shape[1])
+        for position, _ in self._sort_keys:
+            key, token = self.model.sort_keys.get(position)
+            sort_columns.append((token, key, df.iloc[:, position] if key is None else None))
+        ascending = [up for _, up in self._sort_keys]
+        tokens = [token for token, _, _ in search_columns]
+        row_count = len(df)
+
+        rows = None
+        previous = self._last_search
+        if query and previous is not None and not use_regex and not previous[2] and previous[1] == scope and previous[3] == tokens and query.lower().startswith(previous[0].lower()):
+            rows = previous[4]
+
+        def arrange(job):
+            steps = len(search_columns) + len(sort_columns)
+            mask, built_strings, built_keys = None, [], []
+            for number, (token, strings, column) in enumerate(search_columns):
+                job.report_progress(number / steps)
+                if strings is None:
+                    strings = build_search_strings(column)
+                    built_strings.append((token, strings))
+                matches = match_rows(strings, query, use_regex, rows)
+                mask = matches if mask is None else mask | matches
+            matched = None if mask is None else (np.flatnonzero(mask) if rows is None else rows[mask])
+            if not sort_columns:
+                return matched, matched, built_strings, built_keys
+            keys = []
+            for number, (token, key, column) in enumerate(sort_columns, start=len(search_columns)):
+                job.report_progress(number / steps)
+                if key is None:
+                    key = build_sort_key(column)
+                    built_keys.append((token, key))
+                keys.append(key)
+            permutation = sort_permutation(keys, ascending)
+            order = permutation if matched is None else filter_permutation(permutation, matched, row_count)
+            return matched, order, built_strings, built_keys
+
+        def finished(result):
+            matched, order, built_strings, built_keys = result
+            for token, strings in built_strings:
+                self.model.search_strings.put(token, strings)
+            for token, key in built_keys:
+                self.model.sort_keys.put(token, key)
+            self._last_search = (query, scope, use_regex, tokens, matched) if query else None
+            self._row_order_shown = True
+            self.view.set_row_order(order, keep_offset=keep_offset)
+
+        label = self._("job_search") if query else self._("job_sort")
+        self.jobs.submit("row_order", arrange, on_success=finished, on_error=self._on_job_failed, label=label, supersede=True)
+
+    def on_dedup_options(self):
+        """
+        Dedup on a subset of key columns, keeping the first or last copy, with a preview of the duplicate groups.
+        """
+        if self.model.df.empty:
+            self.log_and_update_status(self._("log_error_no_data_op"), level="error")
+            return
+        toplevel = ctk.CTkToplevel(self.view)
+        toplevel.title(self._("dedup_title"))
+        toplevel.geometry("640x600")
+        toplevel.transient(self.view.master)
+        ctk.CTkLabel(toplevel, text=self._("dedup_prompt"), font=ctk.CTkFont(size=15, weight="bold")).pack(pady=10)
+        scrollable_frame = ctk.CTkScrollableFrame(toplevel, height=150)
+        scrollable_frame.pack(fill="x", padx=10)
+        column_vars = {name: ctk.BooleanVar(value=True) for name in self.model.df.columns}
+        for name, var in column_vars.items():
+            ctk.CTkCheckBox(scrollable_frame, text=name, variable=var).pack(anchor="w", padx=10, pady=5)
+        keep_options = {self._("dedup_keep_first"): 'first', self._("dedup_keep_last"): 'last'}
+        keep_var = ctk.StringVar(value=self._("dedup_keep_first"))
+        ctk.CTkSegmentedButton(toplevel, values=list(keep_options), variable=keep_var).pack(pady=10)
+        preview_box = ctk.CTkTextbox(toplevel, wrap="none", font=ctk.CTkFont(family="Courier"))
+        preview_box.pack(fill="both", expand=True, padx=10)
+
+        def selection():
+            subset = [name for name, var in column_vars.items() if var.get()]
+            return (None if len(subset) == len(column_vars) else subset), keep_options[keep_var.get()]
+
+        def show_preview(result):
+            rows_to_remove, group_count, groups = result
+            preview_box.delete("1.0", "end")
+            preview_box.insert("1.0", self._("dedup_preview_summary").format(rows=rows_to_remove, groups=group_count) + "\n\n" + (groups.to_string(max_rows=500) if len(groups) else ""))
+
+        def preview():
+            subset, keep = selection()
+            if subset == []:
+                return
+            if self.jobs.is_busy("data", "export"):
+                self.log_and_update_status(self._("log_error_job_busy"), level="error"); return
+            self.jobs.submit("data", lambda job: self.model.duplicate_groups(subset, keep), on_success=show_preview, on_error=self._on_job_failed, label=self._("job_data_op"), cancellable=False)
+
+        def apply_changes():
+            subset, keep = selection()
+            if subset != []:
+                self._run_data_op(self.model.remove_duplicate_rows, subset, keep)
+            toplevel.destroy()
+        button_frame = ctk.CTkFrame(toplevel, fg_color="transparent")
+        button_frame.pack(pady=10)
+        ctk.CTkButton(button_frame, text=self._("cancel_button"), command=toplevel.destroy).pack(side="left", padx=10)
+        ctk.CTkButton(button_frame, text=self._("dedup_preview_button"), command=preview).pack(side="left", padx=10)
+        ctk.CTkButton(button_frame, text=self._("apply_button"), command=apply_changes).pack(side="left", padx=10)
+
+    def on_find_replace(self):
+        """
+        Find and replace in the chosen text columns, with a count of the matching cells before applying.
+        """
+        if self.model.df.empty:
+            self.log_and_update_status(self._("log_error_no_data_op"), level="error")
+            return
+        toplevel = ctk.CTkToplevel(self.view)
+        toplevel.title(self._("find_replace_title"))
+        toplevel.geometry("480x600")
+        toplevel.transient(self.view.master)
+        find_entry = ctk.CTkEntry(toplevel, placeholder_text=self._("find_placeholder"))
+        find_entry.pack(fill="x", padx=10, pady=(10, 5))
+        replace_entry = ctk.CTkEntry(toplevel, placeholder_text=self._("replace_placeholder"))
+        replace_entry.pack(fill="x", padx=10, pady=5)
+        options_frame = ctk.CTkFrame(toplevel, fg_color="transparent")
+        options_frame.pack(pady=5)
+        regex_var, case_var, whole_cell_var = ctk.BooleanVar(), ctk.BooleanVar(), ctk.BooleanVar()
+        ctk.CTkCheckBox(options_frame, text=self._("find_regex_check"), variable=regex_var).pack(side="left", padx=5)
+        ctk.CTkCheckBox(options_frame, text=self._("find_case_check"), variable=case_var).pack(side="left", padx=5)
+        ctk.CTkCheckBox(options_frame, text=self._("find_whole_cell_check"), variable=whole_cell_var).pack(side="left", padx=5)
+        ctk.CTkLabel(toplevel, text=self._("find_replace_prompt"), font=ctk.CTkFont(weight="bold")).pack(pady=(10, 0))
+        scrollable_frame = ctk.CTkScrollableFrame(toplevel, height=150)
+        scrollable_frame.pack(fill="x", padx=10)
+        text_columns = [name for name, dtype in self.model.df.dtypes.items() if is_text_dtype(dtype)]
+        column_vars = {name: ctk.BooleanVar(value=True) for name in text_columns}
+        for name, var in column_vars.items():
+            ctk.CTkCheckBox(scrollable_frame, text=name, variable=var).pack(anchor="w", padx=10, pady=5)
+        preview_box = ctk.CTkTextbox(toplevel, height=120, wrap="none")
+        preview_box.pack(fill="both", expand=True, padx=10, pady=(10, 0))
+
+        def selection():
+            """
+            (find, columns, use_regex, case_sensitive, whole_cell), or None if there is nothing to do.
+            """
+            find = find_entry.get()
+            if not find:
+                self.log_and_update_status(self._("log_error_no_find_text"), level="error"); return None
+            columns = [name for name, var in column_vars.items() if var.get()]
+            if not columns:
+                return None
+            try:
+                build_pattern(find, regex_var.get(), case_var.get(), whole_cell_var.get())
+            except re.error as e:
+                self.log_and_update_status(self._("log_error_invalid_regex").format(e=e), level="error"); return None
+            if self.jobs.is_busy("data", "export"):
+                self.log_and_update_status(self._("log_error_job_busy"), level="error"); return None
+            return find, (None if len(columns) == len(column_vars) else columns), regex_var.get(), case_var.get(), whole_cell_var.get()
+
+        def show_preview(counts):
+            preview_box.delete("1.0", "end")
+            lines = [self._("find_preview_summary").format(cells=sum(counts.values()), columns=len(counts))]
+            lines += [f"{name}: {count}" for name, count in counts.items()]
+            preview_box.insert("1.0", "\n".join(lines))
+
+        def preview():
+            selected = selection()
+            if selected is not None:
+                find, columns, use_regex, case_sensitive, whole_cell = selected
+                self.jobs.submit("data", lambda job: self.model.count_matches(find, columns, use_regex, case_sensitive, whole_cell),
+                                 on_success=show_preview, on_error=self._on_job_failed, label=self._("job_data_op"), cancellable=False)
+
+        def apply_changes():
+            selected = selection()
+            if selected is not None:
+                find, columns, use_regex, case_sensitive, whole_cell = selected
+                self._run_data_op(self.model.replace_values, find, replace_entry.get(), columns, use_regex, case_sensitive, whole_cell)
+                toplevel.destroy()
+        button_frame = ctk.CTkFrame(toplevel, fg_color="transparent")
+        button_frame.pack(pady=10)
+        ctk.CTkButton(button_frame, text=self._("cancel_button"), command=toplevel.destroy).pack(side="left", padx=10)
+        ctk.CTkButton(button_frame, text=self._("find_preview_button"), command=preview).pack(side="left", padx=10)
+        ctk.CTkButton(button_frame, text=self._("apply_button"), command=apply_changes).pack(side="left", padx=10)
+
     def on_cell_update(self, row_index: int, column_name: str, new_value: str):
+        if self._chunked_edit_blocked():
+            return
         self._run_data_op(self.model.update_cell, row_index, column_name, new_value)
 
     def on_file_drop(self, file_path_str: str):
-        file_path = file_path_str.strip('{}')
+        # Tk passes the dropped paths as a Tcl list, with braces around paths that contain spaces
+        file_paths = self.view.tk.splitlist(file_path_str)
+        if not file_paths:
+            return
+        self._last_parse_request = None # Dropping the same file again reloads it
+        if len(file_paths) > 1:
+            self._open_merged_files(file_paths); return
+        file_path = file_paths[0]
+        self._merge_sources = None
+        if self.model.columnar_format(file_path):
+            self._open_columnar_file(file_path); return
         allowed_extensions = ['.txt', '.csv', '.tsv', '.md']
         if not any(file_path.lower().endswith(ext) for ext in allowed_extensions):
             self.log_and_update_status(self._("log_warning_unsupported_format").format(file=os.path.basename(file_path)), level="info")
-        content, used_encoding = self.read_file_robustly(file_path)
-        if content is not None:
-            self.view.textbox.delete("1.0", "end")
-            self.view.textbox.insert("1.0", content)
+        head_text, used_encoding, truncated = self.read_file_head(file_path)
+        if head_text is not None:
+            self.log_and_update_status(self._("log_info_file_loaded").format(file=os.path.basename(file_path), encoding=used_encoding))
+            self._source_file = (file_path, used_encoding, head_text)
+            self.view.show_file_source(head_text, os.path.basename(file_path), truncated)
             self.process_input_data()
         else:
             self.log_and_update_status(self._("log_error_file_decode_failed").format(file=os.path.basename(file_path)), level="error")
-    
-    def read_file_robustly(self, file_path):
+
+    def _open_merged_files(self, file_paths):
+        """
+        Several files dropped at once are loaded in parallel and concatenated into one table.
+        """
+        unsupported = [os.path.basename(path) for path in file_paths if not path.lower().endswith(INPUT_EXTENSIONS)]
+        if unsupported:
+            self.log_and_update_status(self._("log_warning_unsupported_format").format(file=", ".join(unsupported)), level="info")
+        self._source_file = None
+        self._merge_sources = list(file_paths)
+        self.log_and_update_status(self._("log_info_files_merging").format(count=len(file_paths)))
+        self.view.show_file_source("\n".join(file_paths), self._("merge_source_name").format(count=len(file_paths)), False, editable=False)
+        self.process_input_data()
+
+    def _open_columnar_file(self, file_path):
+        """
+        Parquet/Feather carry their own schema, so the parse settings do not apply; the input pane only shows that schema.
+        """
+        schema_text = self.model.read_columnar_schema(file_path) or ""
+        self.log_and_update_status(self._("log_info_columnar_loaded").format(file=os.path.basename(file_path)))
+        self._source_file = (file_path, None, schema_text)
+        self.view.show_file_source(schema_text, os.path.basename(file_path), False, editable=False)
+        self.process_input_data()
+
+    def on_edit_raw_text(self):
+        """
+        Explicit opt-in: load the full text of the dropped file into the textbox and parse from there.
+        """
+        if self._source_file is None or self._source_file[1] is None:
+            return
+        file_path, encoding, _ = self._source_file
+        content, used_encoding = self.read_file_robustly(file_path, encoding)
+        if content is None:
+            self.log_and_update_status(self._("log_error_file_decode_failed").format(file=os.path.basename(file_path)), level="error")
+            return
+        self._source_file = None
+        self._last_parse_request = None
+        self.view.set_textbox_content(content)
+        self.process_input_data()
+
+    def _candidate_encodings(self, file_path):
         encodings_to_try = ['utf-8']
         try:
-            with open(file_path, 'rb') as f_raw:
-                detected = chardet.detect(f_raw.read(1024*20))
-                if detected['encoding']: encodings_to_try.insert(0, detected['encoding'])
+            encodings_to_try.insert(0, detect_file_encoding(file_path))
         except Exception: pass
         encodings_to_try.extend(['gbk', 'latin1', 'utf-16'])
-        for encoding in list(dict.fromkeys(encodings_to_try)):
+        return list(dict.fromkeys(encodings_to_try))
+
+    def read_file_head(self, file_path):
+        """
+        Decodes at most FILE_HEAD_BYTES / FILE_HEAD_LINES from the start of the file.
+        Returns (text, encoding, truncated); text is None if no candidate encoding fits.
+        """
+        try:
+            with open(file_path, 'rb') as f_raw:
+                raw = f_raw.read(FILE_HEAD_BYTES + 1)
+        except OSError:
+            return None, None, False
+        truncated = len(raw) > FILE_HEAD_BYTES
+        raw = raw[:FILE_HEAD_BYTES]
+        # Candidates are only checked against the head; the full file is never decoded twice
+        for encoding in self._candidate_encodings(file_path):
             try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    self.log_and_update_status(self._("log_info_file_loaded").format(file=os.path.basename(file_path), encoding=encoding))
-                    return f.read(), encoding
-            except (UnicodeDecodeError, TypeError): continue
-            except Exception as e:
-                # logging.error(f"Error reading file {file_path} with {encoding}: {e}")
-                return None, None
-        return None, None
+                # The incremental decoder holds back a multi-byte character cut at the boundary
+                text = codecs.getincrementaldecoder(encoding)().decode(raw, final=not truncated)
+            except (UnicodeDecodeError, LookupError): continue
+            lines = text.splitlines(keepends=True)
+            if len(lines) > FILE_HEAD_LINES:
+                lines, truncated = lines[:FILE_HEAD_LINES], True
+            elif truncated:
+                lines = lines[:-1] # Drop the partial last line
+            return ''.join(lines), encoding, truncated
+        return None, None, False
+    
+    def read_file_robustly(self, file_path, encoding=None):
+        """
+        Decodes the whole file in a single streaming pass. Bytes that do not fit the
+        detected encoding are replaced instead of triggering a re-read with another codec.
+        """
+        try:
+            if encoding is None:
+                encoding = detect_file_encoding(file_path)
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            parts = []
+            with open(file_path, 'rb') as f:
+                while chunk := f.read(FILE_READ_CHUNK_BYTES):
+                    parts.append(decoder.decode(chunk))
+            parts.append(decoder.decode(b"", final=True))
+        except (OSError, LookupError):
+            return None, None
+        content = ''.join(parts)
+        if '\ufffd' in content:
+            logging.warning(f"文件 {os.path.basename(file_path)} 中有无法以 {encoding} 解码的字节，已替换。")
+        self.log_and_update_status(self._("log_info_file_loaded").format(file=os.path.basename(file_path), encoding=encoding))
+        return content, encoding
+
+    def on_save_recipe(self):
+        recipe = Recipe.from_history(self.model.history)
+        if not recipe.steps:
+            self.log_and_update_status(self._("log_error_empty_recipe"), level="error"); return
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Recipe", "*.json")])
+        if not file_path: return
+        try:
+            recipe.save(file_path)
+            self.log_and_update_status(self._("log_info_recipe_saved").format(file=os.path.basename(file_path), steps=len(recipe.steps)))
+        except OSError as e:
+            self.log_and_update_status(self._("log_error_recipe_failed").format(e=e), level="error")
+
+    def on_apply_recipe(self):
+        file_path = filedialog.askopenfilename(filetypes=[("Recipe", "*.json")])
+        if not file_path: return
+        try:
+            recipe = Recipe.load(file_path)
+        except (OSError, ValueError) as e:
+            self.log_and_update_status(self._("log_error_recipe_failed").format(e=e), level="error"); return
+        self._run_data_op(recipe.apply, self.model)
+
+    def on_batch_recipe(self):
+        recipe = Recipe.from_history(self.model.history)
+        if not recipe.steps:
+            self.log_and_update_status(self._("log_error_empty_recipe"), level="error"); return
+        settings = self._read_parse_settings()
+        if settings is None: return
+        input_dir = filedialog.askdirectory()
+        if not input_dir: return
+        output_dir = filedialog.askdirectory()
+        if not output_dir: return
+        _, header_row, skip_rows, quote_char = settings
+        # The delimiter is detected per file
+        batch_settings = {"header_row": header_row, "skip_rows": skip_rows, "quote_char": quote_char}
+
+        def batch(job):
+            return run_batch(recipe, input_dir, output_dir, settings=batch_settings, progress=job.report_progress)
+
+        def finished(results):
+            for input_path, success, message in results:
+                if not success:
+                    self.log_and_update_status(f"{os.path.basename(input_path)}: {message}", level="error")
+            succeeded = sum(1 for _, success, _ in results if success)
+            self.log_and_update_status(self._("log_info_batch_done").format(ok=succeeded, total=len(results)))
+
+        self.jobs.submit("batch", batch, on_success=finished, on_error=self._on_job_failed, label=self._("job_batch"))
 
     def on_load_example_data(self):
-        self.view.textbox.delete("1.0", "end")
-        self.view.textbox.insert("1.0", EXAMPLE_DATA)
+        self._source_file = None
+        self._merge_sources = None
+        self._last_parse_request = None
+        self.view.set_textbox_content(EXAMPLE_DATA)
         self.process_input_data()
         
     def _export_file(self, file_type: str):
         if self.model.df.empty:
             self.log_and_update_status(self._("log_error_no_data_export"), level="error"); return
-        file_path, export_func = (filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")]), self.model.export_to_excel) if file_type == 'excel' else (filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")]), self.model.export_to_csv)
+        extension, type_name, export_func = {
+            'excel': (".xlsx", "Excel", self.model.export_to_excel),
+            'csv': (".csv", "CSV", self.model.export_to_csv),
+            'parquet': (".parquet", "Parquet", self.model.export_to_parquet),
+            'feather': (".feather", "Feather", self.model.export_to_feather),
+        }[file_type]
+        file_path = filedialog.asksaveasfilename(defaultextension=extension, filetypes=[(type_name, f"*{extension}")])
         if not file_path:
             self.log_and_update_status(self._("log_info_export_cancelled")); return
-        success, message = export_func(file_path)
+        if self.jobs.is_busy("data", "export"):
+            self.log_and_update_status(self._("log_error_job_busy"), level="error"); return
+        if self._chunked_source is not None:
+            self._export_chunked(file_type, file_path); return
+        options = {'compression': self.view.compression_var.get()} if file_type in ('parquet', 'feather') else {}
+        df = self.model.df
+        def export(job, span):
+            result = export_func(file_path, progress=job.report_progress, df=df, **options)
+            span.set_output(df)
+            return result
+        self._submit_timed("export", export_func.__name__, export, df, on_success=lambda result: self._on_export_finished(file_path, result), label=self._("job_export"))
+
+    def _export_chunked(self, file_type, file_path):
+        """
+        Streams the whole source file through the cleaning steps applied to the first-chunk preview.
+        """
+        if file_type not in ('excel', 'csv'):
+            self.log_and_update_status(self._("log_error_chunked_format"), level="error"); return
+        source_path, encoding, settings = self._chunked_source
+        steps = Recipe.from_history(self.model.history).steps
+        self._submit_timed("export", "stream_clean_file", lambda job, span: stream_clean_file(source_path, file_path, encoding, *settings, steps, progress=job.report_progress), on_success=lambda result: self._on_export_finished(file_path, result), label=self._("job_export"))
+
+    def _on_export_finished(self, file_path, result):
+        success, message = result
         self.log_and_update_status(message)
         if success and self.view.open_after_export_var.get():
             try:
@@ -171,6 +828,8 @@ class AppController:
 
     def on_export_to_excel(self): self._export_file('excel')
     def on_export_to_csv(self): self._export_file('csv')
+    def on_export_to_parquet(self): self._export_file('parquet')
+    def on_export_to_feather(self): self._export_file('feather')
 
     def on_switch_language(self, lang_choice: str):
         lang_code = "zh" if lang_choice == "中文" else "en"
@@ -183,6 +842,8 @@ class AppController:
         try:
             config = self.view.get_settings()
             config["language"] = translator.language
+            config["undo_memory_mb"] = self.model.history.budget_bytes // (1024 * 1024)
+            config["profile_op"] = self._profile_op
             with open(self.CONFIG_FILE, 'w') as f: json.dump(config, f, indent=4)
             logging.info("Configuration saved.")
         except Exception as e:
@@ -198,6 +859,8 @@ class AppController:
                 self.view.update_ui_text()
                 
                 self.view.set_settings(config)
+                self.model.history.set_budget(int(config.get("undo_memory_mb", 256)) * 1024 * 1024)
+                self._profile_op = config.get("profile_op", "")
                 self.log_and_update_status(self._("log_info_config_loaded"))
         except Exception as e:
             self.log_and_update_status(self._("log_error_config_load_failed").format(e=e), level="error") 
\ No newline at end of file
@@ -4,15 +4,27 @@ from PIL import Image
 import os
 from tkinterdnd2 import DND_FILES
 from i18n import get_translator
-from utils import Tooltip
+from utils import Tooltip, format_preview_rows
 import logging
 
+PREVIEW_ROW_HEIGHT = 25
+PREVIEW_BUFFER_ROWS = 20
+PROFILE_FIELDS = ("column", "type", "nulls", "distinct", "min", "max")
+PROFILE_VALUE_CHARS = 40
+
 class AppView(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
         self.controller = None
         self._debounce_timer = None
         self._edit_entry = None # Track the current edit entry
+        self._preview_df = None # Only the visible window of this frame is materialized in the tree
+        self._preview_columns = []
+        self._preview_offset = 0
+        self._row_order = None # Row positions shown by the preview (search results), None for all rows
+        self._search_timer = None
+        self._selected_rows = set()
+        self._file_source_name = None
         self.pack(fill="both", expand=True)
 
         self.style = ttk.Style()
@@ -33,22 +45,48 @@ class AppView(ctk.CTkFrame):
         self.textbox.dnd_bind('<<Drop>>', lambda e: self.controller.on_file_drop(e.data))
         
         self.example_data_button.configure(command=self.controller.on_load_example_data)
+        self.edit_raw_button.configure(command=self.controller.on_edit_raw_text)
         self.lang_switch.configure(command=self.controller.on_switch_language)
         self.remove_empty_button.configure(command=self.controller.on_remove_empty_rows)
         self.remove_duplicates_button.configure(command=self.controller.on_remove_duplicate_rows)
         self.normalize_columns_button.configure(command=self.controller.on_normalize_column_names)
+        self.dedup_options_button.configure(command=self.controller.on_dedup_options)
         self.fill_na_button.configure(command=self.controller.on_fill_na_global)
+        self.find_replace_button.configure(command=self.controller.on_find_replace)
+        self.save_recipe_button.configure(command=self.controller.on_save_recipe)
+        self.apply_recipe_button.configure(command=self.controller.on_apply_recipe)
+        self.batch_recipe_button.configure(command=self.controller.on_batch_recipe)
         self.export_excel_button.configure(command=self.controller.on_export_to_excel)
         self.export_csv_button.configure(command=self.controller.on_export_to_csv)
+        self.export_parquet_button.configure(command=self.controller.on_export_to_parquet)
+        self.export_feather_button.configure(command=self.controller.on_export_to_feather)
         self.delete_rows_button.configure(command=self.controller.on_delete_selected_rows)
         self.manage_columns_button.configure(command=self.controller.on_manage_columns)
+        self.profile_button.configure(command=self.controller.on_toggle_profile)
+        self.undo_button.configure(command=self.controller.on_undo)
+        self.redo_button.configure(command=self.controller.on_redo)
+        self.cancel_job_button.configure(command=self.controller.on_cancel_jobs)
 
         self.tree.bind("<Double-1>", self.on_treeview_double_click)
+        self.tree.bind("<Control-z>", lambda e: self.controller.on_undo())
+        self.tree.bind("<Control-y>", lambda e: self.controller.on_redo())
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<Button-1>", self._on_tree_click, add="+")
+        self.tree.bind("<Configure>", lambda e: self._render_preview_window())
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_preview_mousewheel)
 
         self.delimiter_var.trace_add("write", self._debounce_input)
         self.header_row_var.trace_add("write", self._debounce_input)
         self.skip_rows_var.trace_add("write", self._debounce_input)
         self.quote_char_var.trace_add("write", self._debounce_input)
+        self.compact_dtypes_var.trace_add("write", self._debounce_input)
+        self.chunked_mode_var.trace_add("write", self._debounce_input)
+        self.merge_intersection_var.trace_add("write", self._debounce_input)
+        self.merge_source_column_var.trace_add("write", self._debounce_input)
+        self.search_var.trace_add("write", self._debounce_search)
+        self.search_scope_var.trace_add("write", self._debounce_search)
+        self.search_regex_var.trace_add("write", self._debounce_search)
 
     def _create_widgets(self):
         _ = get_translator().get
@@ -58,13 +96,18 @@ class AppView(ctk.CTkFrame):
         self.left_frame = ctk.CTkFrame(self, width=400, corner_radius=0); self.left_frame.grid(row=0, column=0, sticky="nsew")
         self.left_frame.grid_rowconfigure(0, weight=1); self.left_frame.grid_rowconfigure(1, weight=1)
         self.right_frame = ctk.CTkFrame(self); self.right_frame.grid(row=0, column=1, sticky="nsew", padx=5, pady=5)
-        self.right_frame.grid_columnconfigure(0, weight=1); self.right_frame.grid_rowconfigure(0, weight=1); self.right_frame.grid_rowconfigure(1, weight=0)
+        self.right_frame.grid_columnconfigure(0, weight=1); self.right_frame.grid_columnconfigure(1, weight=0); self.right_frame.grid_rowconfigure(0, weight=1); self.right_frame.grid_rowconfigure(1, weight=0)
 
         bottom_frame = ctk.CTkFrame(self); bottom_frame.grid(row=1, column=0, columnspan=2, sticky="ew")
         bottom_frame.grid_columnconfigure(0, weight=1)
         self.history_log = ctk.CTkTextbox(bottom_frame, height=100); self.history_log.pack(fill="x", expand=True, padx=5, pady=(5,0)); self.history_log.configure(state="disabled")
         self.status_bar = ctk.CTkFrame(bottom_frame, height=30); self.status_bar.pack(fill="x", expand=True, padx=5, pady=(0,5))
         self.status_label = ctk.CTkLabel(self.status_bar, text=""); self.status_label.pack(side="left", padx=10)
+        # Background job indicator, only packed while a job is running
+        self.cancel_job_button = ctk.CTkButton(self.status_bar, width=60, height=22, fg_color="gray", hover_color="#7f8c8d")
+        self.job_progress = ctk.CTkProgressBar(self.status_bar, width=160)
+        self.job_label = ctk.CTkLabel(self.status_bar, text="", text_color="gray")
+        self.last_op_label = ctk.CTkLabel(self.status_bar, text="", text_color="gray"); self.last_op_label.pack(side="right", padx=10)
 
         self.input_frame = ctk.CTkFrame(self.left_frame, fg_color="transparent"); self.input_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
         self.input_frame.grid_columnconfigure(0, weight=1); self.input_frame.grid_rowconfigure(2, weight=1)
@@ -73,6 +116,7 @@ class AppView(ctk.CTkFrame):
         self.input_label = ctk.CTkLabel(input_header_frame, image=self.input_icon, compound="left", font=ctk.CTkFont(size=15, weight="bold")); self.input_label.grid(row=0, column=0, sticky="w", padx=5, pady=5)
         self.hint_label = ctk.CTkLabel(self.input_frame, text_color="gray", font=ctk.CTkFont(size=12)); self.hint_label.grid(row=1, column=0, sticky="w", padx=5, pady=(0,5))
         self.example_data_button = ctk.CTkButton(input_header_frame, width=80); self.example_data_button.grid(row=0, column=1, sticky="e", padx=5, pady=5)
+        self.edit_raw_button = ctk.CTkButton(input_header_frame, width=80) # Only gridded while a dropped file is the parse source
         self.textbox = ctk.CTkTextbox(self.input_frame); self.textbox.grid(row=2, column=0, columnspan=2, sticky="nsew")
 
         self.settings_frame = ctk.CTkScrollableFrame(self.left_frame, fg_color="transparent"); self.settings_frame.grid(row=1, column=0, sticky="nsew", padx=10, pady=10); self.settings_frame.grid_columnconfigure(0, weight=1)
@@ -93,60 +137,146 @@ class AppView(ctk.CTkFrame):
         self.header_row_var = ctk.StringVar(); self.header_row_label = ctk.CTkLabel(parser_config_frame); self.header_row_label.grid(row=0, column=0, padx=(10,0), pady=5); ctk.CTkEntry(parser_config_frame, textvariable=self.header_row_var, width=60).grid(row=0, column=1, padx=5, pady=5, sticky="w")
         self.skip_rows_var = ctk.StringVar(); self.skip_rows_label = ctk.CTkLabel(parser_config_frame); self.skip_rows_label.grid(row=0, column=2, padx=(10,0), pady=5); ctk.CTkEntry(parser_config_frame, textvariable=self.skip_rows_var, width=60).grid(row=0, column=3, padx=5, pady=5, sticky="w")
         self.quote_char_var = ctk.StringVar(); self.quote_char_label = ctk.CTkLabel(parser_config_frame); self.quote_char_label.grid(row=1, column=0, padx=(10,0), pady=5); self.quote_char_option_menu = ctk.CTkOptionMenu(parser_config_frame, variable=self.quote_char_var, values=['"', "'", _("no_quote_char")]); self.quote_char_option_menu.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+        self.compact_dtypes_var = ctk.BooleanVar(); self.compact_dtypes_check = ctk.CTkCheckBox(parser_config_frame, variable=self.compact_dtypes_var); self.compact_dtypes_check.grid(row=1, column=2, columnspan=2, padx=(10,0), pady=5, sticky="w"); self.compact_dtypes_tooltip = Tooltip(self.compact_dtypes_check, "")
+        self.chunked_mode_var = ctk.BooleanVar(); self.chunked_mode_check = ctk.CTkCheckBox(parser_config_frame, variable=self.chunked_mode_var); self.chunked_mode_check.grid(row=2, column=0, columnspan=4, padx=(10,0), pady=5, sticky="w"); self.chunked_mode_tooltip = Tooltip(self.chunked_mode_check, "")
+        self.merge_intersection_var = ctk.BooleanVar(); self.merge_intersection_check = ctk.CTkCheckBox(parser_config_frame, variable=self.merge_intersection_var); self.merge_intersection_check.grid(row=3, column=0, columnspan=2, padx=(10,0), pady=5, sticky="w"); self.merge_intersection_tooltip = Tooltip(self.merge_intersection_check, "")
+        self.merge_source_column_var = ctk.BooleanVar(); self.merge_source_column_check = ctk.CTkCheckBox(parser_config_frame, variable=self.merge_source_column_var); self.merge_source_column_check.grid(row=3, column=2, columnspan=2, padx=(10,0), pady=5, sticky="w"); self.merge_source_column_tooltip = Tooltip(self.merge_source_column_check, "")
 
         self.cleaning_label = ctk.CTkLabel(self.settings_frame, font=ctk.CTkFont(weight="bold")); self.cleaning_label.grid(row=4, column=0, columnspan=2, sticky="w", padx=5, pady=(15, 5))
         cleaning_frame = ctk.CTkFrame(self.settings_frame); cleaning_frame.grid(row=5, column=0, columnspan=2, sticky="ew", pady=5); cleaning_frame.grid_columnconfigure((0,1), weight=1)
         self.remove_empty_button = ctk.CTkButton(cleaning_frame); self.remove_empty_button.grid(row=0, column=0, padx=5, pady=5, sticky="ew"); self.remove_empty_tooltip = Tooltip(self.remove_empty_button, "")
         self.remove_duplicates_button = ctk.CTkButton(cleaning_frame); self.remove_duplicates_button.grid(row=0, column=1, padx=5, pady=5, sticky="ew"); self.remove_duplicates_tooltip = Tooltip(self.remove_duplicates_button, "")
         self.normalize_columns_button = ctk.CTkButton(cleaning_frame); self.normalize_columns_button.grid(row=1, column=0, padx=5, pady=5, sticky="ew"); self.normalize_columns_tooltip = Tooltip(self.normalize_columns_button, "")
+        self.dedup_options_button = ctk.CTkButton(cleaning_frame); self.dedup_options_button.grid(row=1, column=1, padx=5, pady=5, sticky="ew"); self.dedup_options_tooltip = Tooltip(self.dedup_options_button, "")
         fill_na_frame = ctk.CTkFrame(cleaning_frame); fill_na_frame.grid(row=2, column=0, columnspan=2, pady=5, sticky="ew"); fill_na_frame.grid_columnconfigure(0, weight=1)
         self.fill_na_entry = ctk.CTkEntry(fill_na_frame); self.fill_na_entry.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
         self.fill_na_button = ctk.CTkButton(fill_na_frame, width=80); self.fill_na_button.grid(row=0, column=1, padx=5, pady=5); self.fill_na_tooltip = Tooltip(self.fill_na_button, "")
+        self.find_replace_button = ctk.CTkButton(cleaning_frame); self.find_replace_button.grid(row=3, column=0, columnspan=2, padx=5, pady=5, sticky="ew"); self.find_replace_tooltip = Tooltip(self.find_replace_button, "")
+        recipe_frame = ctk.CTkFrame(cleaning_frame, fg_color="transparent"); recipe_frame.grid(row=4, column=0, columnspan=2, pady=5, sticky="ew"); recipe_frame.grid_columnconfigure((0,1,2), weight=1)
+        self.save_recipe_button = ctk.CTkButton(recipe_frame); self.save_recipe_button.grid(row=0, column=0, padx=5, pady=5, sticky="ew"); self.save_recipe_tooltip = Tooltip(self.save_recipe_button, "")
+        self.apply_recipe_button = ctk.CTkButton(recipe_frame); self.apply_recipe_button.grid(row=0, column=1, padx=5, pady=5, sticky="ew"); self.apply_recipe_tooltip = Tooltip(self.apply_recipe_button, "")
+        self.batch_recipe_button = ctk.CTkButton(recipe_frame); self.batch_recipe_button.grid(row=0, column=2, padx=5, pady=5, sticky="ew"); self.batch_recipe_tooltip = Tooltip(self.batch_recipe_button, "")
 
         self.export_label = ctk.CTkLabel(self.settings_frame, font=ctk.CTkFont(weight="bold")); self.export_label.grid(row=6, column=0, columnspan=2, sticky="w", padx=5, pady=(15, 5))
         export_frame = ctk.CTkFrame(self.settings_frame); export_frame.grid(row=7, column=0, columnspan=2, sticky="ew", pady=5); export_frame.grid_columnconfigure((0,1), weight=1)
         self.export_excel_button = ctk.CTkButton(export_frame); self.export_excel_button.grid(row=0, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
         self.export_csv_button = ctk.CTkButton(export_frame); self.export_csv_button.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
-        self.open_after_export_var = ctk.BooleanVar(); self.open_after_export_check = ctk.CTkCheckBox(export_frame, variable=self.open_after_export_var); self.open_after_export_check.grid(row=2, column=0, columnspan=2, padx=5, pady=10)
+        self.export_parquet_button = ctk.CTkButton(export_frame); self.export_parquet_button.grid(row=2, column=0, padx=5, pady=5, sticky="ew"); self.export_parquet_tooltip = Tooltip(self.export_parquet_button, "")
+        self.export_feather_button = ctk.CTkButton(export_frame); self.export_feather_button.grid(row=2, column=1, padx=5, pady=5, sticky="ew"); self.export_feather_tooltip = Tooltip(self.export_feather_button, "")
+        self.compression_var = ctk.StringVar(value="zstd"); self.compression_label = ctk.CTkLabel(export_frame); self.compression_label.grid(row=3, column=0, padx=5, pady=5, sticky="e"); self.compression_option_menu = ctk.CTkOptionMenu(export_frame, variable=self.compression_var, values=['zstd', 'lz4', 'none']); self.compression_option_menu.grid(row=3, column=1, padx=5, pady=5, sticky="w")
+        self.open_after_export_var = ctk.BooleanVar(); self.open_after_export_check = ctk.CTkCheckBox(export_frame, variable=self.open_after_export_var); self.open_after_export_check.grid(row=4, column=0, columnspan=2, padx=5, pady=10)
 
         self.preview_label = ctk.CTkLabel(self.right_frame, image=self.preview_icon, compound="left", font=ctk.CTkFont(size=15, weight="bold")); self.preview_label.grid(row=0, column=0, sticky="nw", padx=10, pady=5)
-        self.tree = ttk.Treeview(self.right_frame, show="headings", selectmode="extended", style="Custom.Treeview"); self.tree.grid(row=0, column=0, sticky="nsew", padx=10, pady=(30, 10))
-        preview_controls_frame = ctk.CTkFrame(self.right_frame, fg_color="transparent"); preview_controls_frame.grid(row=1, column=0, sticky="ew", padx=10, pady=5); preview_controls_frame.grid_columnconfigure(0, weight=1); preview_controls_frame.grid_columnconfigure(1, weight=1)
+        search_frame = ctk.CTkFrame(self.right_frame, fg_color="transparent"); search_frame.grid(row=0, column=0, sticky="ne", padx=10, pady=2)
+        self.search_var = ctk.StringVar(); self.search_entry = ctk.CTkEntry(search_frame, textvariable=self.search_var, width=180, height=26); self.search_entry.grid(row=0, column=0, padx=(0, 5))
+        self.search_scope_var = ctk.StringVar(); self.search_scope_menu = ctk.CTkOptionMenu(search_frame, variable=self.search_scope_var, values=[""], width=120, height=26, dynamic_resizing=False); self.search_scope_menu.grid(row=0, column=1, padx=(0, 5))
+        self.search_regex_var = ctk.BooleanVar(); self.search_regex_check = ctk.CTkCheckBox(search_frame, variable=self.search_regex_var, checkbox_width=18, checkbox_height=18); self.search_regex_check.grid(row=0, column=2)
+        self.tree = ttk.Treeview(self.right_frame, show="headings", selectmode="extended", style="Custom.Treeview"); self.tree.grid(row=0, column=0, sticky="nsew", padx=(10, 0), pady=(30, 10))
+        self.tree_scrollbar = ctk.CTkScrollbar(self.right_frame, command=self._on_preview_scroll); self.tree_scrollbar.grid(row=0, column=1, sticky="ns", padx=(0, 5), pady=(30, 10))
+        preview_controls_frame = ctk.CTkFrame(self.right_frame, fg_color="transparent"); preview_controls_frame.grid(row=1, column=0, sticky="ew", padx=10, pady=5); preview_controls_frame.grid_columnconfigure(0, weight=1); preview_controls_frame.grid_columnconfigure(3, weight=1)
+        self.undo_button = ctk.CTkButton(preview_controls_frame, width=70); self.undo_button.grid(row=0, column=1, padx=5, pady=5)
+        self.redo_button = ctk.CTkButton(preview_controls_frame, width=70); self.redo_button.grid(row=0, column=2, padx=5, pady=5)
         self.manage_columns_button = ctk.CTkButton(preview_controls_frame); self.manage_columns_button.grid(row=0, column=0, padx=5, pady=5, sticky="e")
-        self.delete_rows_button = ctk.CTkButton(preview_controls_frame, fg_color="red", hover_color="#c0392b"); self.delete_rows_button.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+        self.delete_rows_button = ctk.CTkButton(preview_controls_frame, fg_color="red", hover_color="#c0392b"); self.delete_rows_button.grid(row=0, column=3, padx=5, pady=5, sticky="w")
+        self.profile_button = ctk.CTkButton(preview_controls_frame, width=90); self.profile_button.grid(row=0, column=4, padx=5, pady=5, sticky="e")
+
+        # Column profile panel, shown next to the preview on demand
+        self.profile_frame = ctk.CTkFrame(self.right_frame); self.profile_frame.grid_columnconfigure(0, weight=1); self.profile_frame.grid_rowconfigure(1, weight=1)
+        self.profile_label = ctk.CTkLabel(self.profile_frame, font=ctk.CTkFont(weight="bold")); self.profile_label.grid(row=0, column=0, sticky="w", padx=5, pady=5)
+        self.profile_tree = ttk.Treeview(self.profile_frame, show="headings", selectmode="browse", style="Custom.Treeview", columns=PROFILE_FIELDS); self.profile_tree.grid(row=1, column=0, sticky="nsew", padx=5, pady=(0, 5))
+        for field in PROFILE_FIELDS: self.profile_tree.column(field, anchor="w", width=90 if field in ("column", "type", "min", "max") else 60, minwidth=40, stretch=True)
+        profile_scrollbar = ctk.CTkScrollbar(self.profile_frame, command=self.profile_tree.yview); profile_scrollbar.grid(row=1, column=1, sticky="ns", pady=(0, 5)); self.profile_tree.configure(yscrollcommand=profile_scrollbar.set)
         
     def update_ui_text(self):
         _ = get_translator().get
         self.master.title(_("app_title"))
         self.status_label.configure(text=_("status_ready"))
         self.input_label.configure(text=_("input_data_label"))
-        self.hint_label.configure(text=_("hint_text"))
+        self.hint_label.configure(text=_("hint_text") if self._file_source_name is None else _("hint_file_source").format(file=self._file_source_name))
         self.example_data_button.configure(text=_("example_data_button"))
+        self.edit_raw_button.configure(text=_("edit_raw_button"))
         self.settings_label.configure(text=_("settings_label"))
         self.delimiter_label.configure(text=_("delimiter_label"))
         self.custom_delimiter_label.configure(text=_("custom_delimiter_label"))
         self.header_row_label.configure(text=_("header_row_label"))
         self.skip_rows_label.configure(text=_("skip_rows_label"))
         self.quote_char_label.configure(text=_("quote_char_label"))
+        self.compact_dtypes_check.configure(text=_("compact_dtypes_check"))
+        self.chunked_mode_check.configure(text=_("chunked_mode_check"))
+        self.merge_intersection_check.configure(text=_("merge_intersection_check"))
+        self.merge_source_column_check.configure(text=_("merge_source_column_check"))
         self.quote_char_option_menu.configure(values=['"', "'", _("no_quote_char")])
         self.cleaning_label.configure(text=_("cleaning_label"))
         self.remove_empty_button.configure(text=_("remove_empty_rows_button"))
         self.remove_duplicates_button.configure(text=_("remove_duplicates_button"))
         self.normalize_columns_button.configure(text=_("normalize_columns_button"))
+        self.dedup_options_button.configure(text=_("dedup_options_button"))
         self.fill_na_entry.configure(placeholder_text=_("fill_na_placeholder"))
         self.fill_na_button.configure(text=_("fill_na_button"))
+        self.find_replace_button.configure(text=_("find_replace_button"))
+        self.save_recipe_button.configure(text=_("save_recipe_button"))
+        self.apply_recipe_button.configure(text=_("apply_recipe_button"))
+        self.batch_recipe_button.configure(text=_("batch_recipe_button"))
         self.export_label.configure(text=_("export_label"))
         self.export_excel_button.configure(text=_("export_excel_button"))
         self.export_csv_button.configure(text=_("export_csv_button"))
+        self.export_parquet_button.configure(text=_("export_parquet_button"))
+        self.export_feather_button.configure(text=_("export_feather_button"))
+        self.compression_label.configure(text=_("compression_label"))
         self.open_after_export_check.configure(text=_("open_after_export_check"))
         self.preview_label.configure(text=_("preview_label"))
+        self.search_entry.configure(placeholder_text=_("search_placeholder"))
+        self.search_regex_check.configure(text=_("search_regex_check"))
+        self._update_search_scopes()
         self.manage_columns_button.configure(text=_("manage_columns_button"))
         self.delete_rows_button.configure(text=_("delete_rows_button"))
+        self.profile_button.configure(text=_("profile_button"))
+        self.profile_label.configure(text=_("profile_label"))
+        for field in PROFILE_FIELDS: self.profile_tree.heading(field, text=_(f"profile_{field}"), anchor="w")
+        self.undo_button.configure(text=_("undo_button"))
+        self.redo_button.configure(text=_("redo_button"))
+        self.cancel_job_button.configure(text=_("cancel_button"))
         
         self.remove_empty_tooltip.text = _("tooltip_remove_empty")
         self.remove_duplicates_tooltip.text = _("tooltip_remove_duplicates")
         self.normalize_columns_tooltip.text = _("tooltip_normalize_columns")
+        self.dedup_options_tooltip.text = _("tooltip_dedup_options")
+        self.compact_dtypes_tooltip.text = _("tooltip_compact_dtypes")
+        self.chunked_mode_tooltip.text = _("tooltip_chunked_mode")
+        self.merge_intersection_tooltip.text = _("tooltip_merge_intersection")
+        self.merge_source_column_tooltip.text = _("tooltip_merge_source_column")
+        self.export_parquet_tooltip.text = _("tooltip_export_columnar")
+        self.export_feather_tooltip.text = _("tooltip_export_columnar")
         self.fill_na_tooltip.text = _("tooltip_fill_na")
+        self.find_replace_tooltip.text = _("tooltip_find_replace")
+        self.save_recipe_tooltip.text = _("tooltip_save_recipe")
+        self.apply_recipe_tooltip.text = _("tooltip_apply_recipe")
+        self.batch_recipe_tooltip.text = _("tooltip_batch_recipe")
+
+    def show_file_source(self, head_text, file_name, truncated, editable=True):
+        """
+        Shows the head of a dropped file read-only; the data itself is parsed from disk.
+        """
+        _ = get_translator().get
+        self._file_source_name = file_name
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        self.textbox.insert("1.0", head_text + ("\n…" if truncated else ""))
+        self.textbox.configure(state="disabled")
+        self.hint_label.configure(text=_("hint_file_source").format(file=file_name))
+        if editable:
+            self.edit_raw_button.grid(row=0, column=2, sticky="e", padx=5, pady=5)
+        else:
+            self.edit_raw_button.grid_forget()
+
+    def set_textbox_content(self, text):
+        _ = get_translator().get
+        self._file_source_name = None
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        self.textbox.insert("1.0", text)
+        self.hint_label.configure(text=_("hint_text"))
+        self.edit_raw_button.grid_forget()
 
     def on_treeview_double_click(self, event):
         if self._edit_entry:
@@ -164,10 +294,10 @@ class AppView(ctk.CTkFrame):
 
         x, y, width, height = self.tree.bbox(item_id, column_index_str)
         
-        row_index = self.tree.index(item_id)
-        column_name = self.tree.column(column_index_str, "id")
-        
+        # Item ids are DataFrame row positions, so they stay valid while the window scrolls
+        row_index = int(item_id)
         column_int_index = int(column_index_str.replace("#", "")) - 1
+        column_name = self._preview_df.columns[column_int_index]
         original_value = self.tree.item(item_id, "values")[column_int_index]
 
         self._edit_entry = ctk.CTkEntry(self.tree, border_width=0, corner_radius=0)
@@ -192,29 +322,251 @@ class AppView(ctk.CTkFrame):
             self.after_cancel(self._debounce_timer)
         self._debounce_timer = self.after(500, self.controller.process_input_data)
 
+    def _debounce_search(self, *args):
+        if self._search_timer:
+            self.after_cancel(self._search_timer)
+        self._search_timer = self.after(200, self.controller.on_search)
+
+    def _update_search_scopes(self):
+        _ = get_translator().get
+        values = [_("search_all_columns")] + [str(col) for col in self._preview_columns]
+        current = self.search_scope_var.get()
+        self.search_scope_menu.configure(values=values)
+        if current not in values[1:]:
+            self.search_scope_var.set(values[0])
+
+    def get_search(self):
+        """
+        Returns (query, column position or None for all columns, use_regex).
+        """
+        scope = self.search_scope_var.get()
+        names = [str(col) for col in self._preview_columns]
+        return self.search_var.get(), names.index(scope) if scope in names else None, self.search_regex_var.get()
+
+    def _on_tree_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != "heading":
+            return
+        column = self.tree.identify_column(event.x)
+        if column:
+            # Shift-click adds the column as a further sort key
+            self.controller.on_sort_column(int(column.replace("#", "")) - 1, extend=bool(event.state & 0x0001))
+
+    def set_sort_indicators(self, sort_keys):
+        """
+        Marks the sorted headings with their direction, numbered when sorting by several columns.
+        """
+        marks = {}
+        for rank, (position, ascending) in enumerate(sort_keys, start=1):
+            marks[position] = ("▲" if ascending else "▼") + (str(rank) if len(sort_keys) > 1 else "")
+        for position, col in enumerate(self._preview_columns):
+            self.tree.heading(f"#{position + 1}", text=f"{col} {marks[position]}" if position in marks else col)
+
+    def set_row_order(self, order, keep_offset=False):
+        """
+        Shows only the given row positions, in that order (None shows every row again).
+        """
+        self._row_order = order
+        self._preview_offset = min(self._preview_offset, self._max_preview_offset()) if keep_offset else 0
+        self._selected_rows.clear()
+        self._render_preview_window()
+        self._update_preview_status()
+
     def update_preview(self, df):
+        self._preview_df = df
+        self._row_order = None
+        self._selected_rows.clear()
+
+        columns = list(df.columns)
+        if columns != self._preview_columns:
+            self.tree["columns"] = columns
+            for col in columns:
+                self.tree.heading(col, text=col, anchor='w')
+                self.tree.column(col, anchor="w", width=120, minwidth=60, stretch=True)
+            self._preview_columns = columns
+            self._update_search_scopes()
+
+        self._preview_offset = min(self._preview_offset, self._max_preview_offset())
+        self._render_preview_window()
+        self._update_preview_status()
+
+    def apply_preview_change(self, df, change):
+        """
+        Patches the rendered window for a TableChange from the model instead of rebuilding it.
+        Falls back to update_preview when the change is unknown or touches the columns.
+        """
+        if change is None or change.full or change.columns_changed or list(df.columns) != self._preview_columns:
+            self.update_preview(df)
+            return
+        shifted = change.rows_removed if change.rows_removed is not None else change.rows_inserted
+        if shifted is not None and self._row_order is not None:
+            # The filtered order holds positions from before the shift
+            self.update_preview(df)
+            return
+        self._preview_df = df
+        start = self._preview_offset
+        rendered = self._window_positions(start, start + len(self.tree.get_children()))
+        if shifted is not None:
+            # Rows below the window move no rendered item; anything else shifts the window's rows
+            self._selected_rows.clear()
+            self._preview_offset = min(self._preview_offset, self._max_preview_offset())
+            window_end = start + self._visible_preview_rows() + PREVIEW_BUFFER_ROWS
+            if len(shifted) and (shifted.min() < window_end or self._preview_offset != start):
+                self._render_preview_window()
+            else:
+                self.tree.selection_remove(*self.tree.selection())
+                self._render_preview_scrollbar()
+            self._update_preview_status()
+            return
+        import numpy as np # Not imported at module level, so the window can open before numpy loads
+        for column_position, row_positions in change.cells.items():
+            row_positions = np.asarray(rendered if row_positions is None else row_positions)
+            for position in row_positions[np.isin(row_positions, rendered)].tolist():
+                value = format_preview_rows(df.iloc[:, [column_position]], position, position + 1)[0][0]
+                self.tree.set(str(position), f"#{column_position + 1}", value)
+
+    def toggle_profile_panel(self):
+        if self.profile_panel_visible():
+            self.profile_frame.grid_forget()
+        else:
+            self.profile_frame.grid(row=0, column=2, rowspan=2, sticky="nsew", padx=(0, 5), pady=(30, 10))
+
+    def profile_panel_visible(self):
+        return bool(self.profile_frame.grid_info())
+
+    def show_profile(self, columns, stats_list):
+        """
+        One row per column; columns whose stats are still being computed show a placeholder.
+        """
+        self.profile_tree.delete(*self.profile_tree.get_children())
+        for position, (name, stats) in enumerate(zip(columns, stats_list)):
+            self.profile_tree.insert("", "end", iid=str(position), values=self._profile_values(name, stats))
+
+    def update_profile_row(self, position, stats):
+        if self.profile_tree.exists(str(position)):
+            name = self.profile_tree.set(str(position), "column")
+            self.profile_tree.item(str(position), values=self._profile_values(name, stats))
+
+    @staticmethod
+    def _profile_values(name, stats):
+        if stats is None:
+            return (name, "…", "", "", "", "")
+        def short(value):
+            text = "" if value is None else str(value)
+            return text if len(text) <= PROFILE_VALUE_CHARS else text[:PROFILE_VALUE_CHARS - 1] + "…"
+        kind = stats["dtype"] if stats["inferred"] in (stats["dtype"], "empty") else f"{stats['dtype']} ({stats['inferred']})"
+        return (name, kind, stats["nulls"], stats["distinct"], short(stats["min"]), short(stats["max"]))
+
+    def _update_preview_status(self):
+        total_rows = len(self._preview_df)
+        total_cols = len(self._preview_df.columns)
+        if self.controller:
+            if self._row_order is None:
+                self.update_status(self.controller._("status_preview").format(rows=total_rows, cols=total_cols))
+            else:
+                self.update_status(self.controller._("status_filtered").format(matches=len(self._row_order), rows=total_rows, cols=total_cols))
+
+    def get_selected_row_positions(self):
+        return sorted(self._selected_rows)
+
+    def _visible_preview_rows(self):
+        return max(1, self.tree.winfo_height() // PREVIEW_ROW_HEIGHT)
+
+    def _total_preview_rows(self):
+        if self._preview_df is None:
+            return 0
+        return len(self._preview_df) if self._row_order is None else len(self._row_order)
+
+    def _window_positions(self, start, stop):
+        return list(range(start, stop)) if self._row_order is None else self._row_order[start:stop].tolist()
+
+    def _max_preview_offset(self):
+        total_rows = self._total_preview_rows()
+        return max(0, total_rows - self._visible_preview_rows())
+
+    def _render_preview_window(self):
         if self._edit_entry:
             self._edit_entry.destroy()
             self._edit_entry = None
 
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        
-        self.tree["columns"] = list(df.columns)
-        for col in df.columns:
-            self.tree.heading(col, text=col, anchor='w')
-            self.tree.column(col, anchor="w", width=120, minwidth=60, stretch=True)
-            
-        for index, row in df.iterrows():
-            self.tree.insert("", "end", values=list(row.astype(str)))
-        
-        total_rows = len(df)
-        total_cols = len(df.columns)
-        if self.controller:
-             self.update_status(self.controller._("status_preview").format(rows=total_rows, cols=total_cols))
+        self.tree.delete(*self.tree.get_children())
+        total_rows = self._total_preview_rows()
+        start = self._preview_offset
+        stop = min(total_rows, start + self._visible_preview_rows() + PREVIEW_BUFFER_ROWS)
+        if start < stop:
+            positions = self._window_positions(start, stop)
+            for position, values in zip(positions, format_preview_rows(self._preview_df, start, stop, self._row_order)):
+                self.tree.insert("", "end", iid=str(position), values=values)
+            selected = [str(p) for p in self._selected_rows.intersection(positions)]
+            if selected:
+                self.tree.selection_set(selected)
+        self.tree.yview_moveto(0)
+        self._render_preview_scrollbar()
+
+    def _render_preview_scrollbar(self):
+        total_rows = self._total_preview_rows()
+        if total_rows:
+            start = self._preview_offset
+            self.tree_scrollbar.set(start / total_rows, min(1.0, (start + self._visible_preview_rows()) / total_rows))
+        else:
+            self.tree_scrollbar.set(0.0, 1.0)
+
+    def _scroll_preview_to(self, offset):
+        offset = max(0, min(int(offset), self._max_preview_offset()))
+        if offset != self._preview_offset:
+            self._preview_offset = offset
+            self._render_preview_window()
+
+    def _on_preview_scroll(self, action, value, unit="units"):
+        if self._preview_df is None:
+            return
+        if action == "moveto":
+            self._scroll_preview_to(float(value) * self._total_preview_rows())
+        elif action == "scroll":
+            step = self._visible_preview_rows() if unit == "pages" else 1
+            self._scroll_preview_to(self._preview_offset + int(value) * step)
+
+    def _on_preview_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self._scroll_preview_to(self._preview_offset - 3)
+        else:
+            self._scroll_preview_to(self._preview_offset + 3)
+        return "break"
+
+    def _on_tree_select(self, event=None):
+        # Selection of rows outside the rendered window is remembered across scrolls
+        rendered = {int(item) for item in self.tree.get_children()}
+        self._selected_rows = {p for p in self._selected_rows if p not in rendered}
+        self._selected_rows.update(int(item) for item in self.tree.selection())
 
     def update_status(self, text):
         self.status_label.configure(text=text)
+
+    def show_last_op(self, text):
+        self.last_op_label.configure(text=text)
+
+    def show_job_progress(self, text, fraction=None):
+        if not self.job_progress.winfo_ismapped():
+            self.cancel_job_button.pack(side="right", padx=(5, 10))
+            self.job_progress.pack(side="right", padx=5)
+            self.job_label.pack(side="right", padx=5)
+        self.job_label.configure(text=text)
+        if fraction is None:
+            if self.job_progress.cget("mode") != "indeterminate":
+                self.job_progress.configure(mode="indeterminate")
+                self.job_progress.start()
+        else:
+            if self.job_progress.cget("mode") != "determinate":
+                self.job_progress.stop()
+                self.job_progress.configure(mode="determinate")
+            self.job_progress.set(fraction)
+
+    def hide_job_progress(self):
+        if self.job_progress.winfo_ismapped():
+            self.job_progress.stop()
+            self.job_progress.configure(mode="determinate")
+            self.cancel_job_button.pack_forget()
+            self.job_progress.pack_forget()
+            self.job_label.pack_forget()
     
     def add_history(self, text):
         self.history_log.configure(state="normal")
@@ -228,7 +580,7 @@ class AppView(ctk.CTkFrame):
         selected_color = self._apply_appearance_mode(ctk.ThemeManager.theme["CTkButton"]["fg_color"])
 
         self.style.theme_use("default")
-        self.style.configure("Treeview", background=fg_color, foreground=text_color, fieldbackground=fg_color, borderwidth=0, rowheight=25)
+        self.style.configure("Treeview", background=fg_color, foreground=text_color, fieldbackground=fg_color, borderwidth=0, rowheight=PREVIEW_ROW_HEIGHT)
         self.style.map('Treeview', background=[('selected', selected_color)], foreground=[('selected', text_color)])
         self.style.configure("Treeview.Heading", background=fg_color, foreground=text_color, font=('Segoe UI', 10, 'bold'), borderwidth=0)
         self.style.map("Treeview.Heading", background=[('active', fg_color)])
@@ -251,7 +603,12 @@ class AppView(ctk.CTkFrame):
             "header_row": self.header_row_var.get(),
             "skip_rows": self.skip_rows_var.get(),
             "quote_char": self.quote_char_var.get(),
-            "open_after_export": self.open_after_export_var.get()
+            "compact_dtypes": self.compact_dtypes_var.get(),
+            "chunked_mode": self.chunked_mode_var.get(),
+            "merge_intersection": self.merge_intersection_var.get(),
+            "merge_source_column": self.merge_source_column_var.get(),
+            "open_after_export": self.open_after_export_var.get(),
+            "columnar_compression": self.compression_var.get()
         }
 
     def set_settings(self, settings):
@@ -259,4 +616,9 @@ class AppView(ctk.CTkFrame):
         self.header_row_var.set(settings.get("header_row", "0"))
         self.skip_rows_var.set(settings.get("skip_rows", "0"))
         self.quote_char_var.set(settings.get("quote_char", '"'))
-        self.open_after_export_var.set(settings.get("open_after_export", True)) 
\ No newline at end of file
+        self.compact_dtypes_var.set(settings.get("compact_dtypes", False))
+        self.chunked_mode_var.set(settings.get("chunked_mode", False))
+        self.merge_intersection_var.set(settings.get("merge_intersection", False))
+        self.merge_source_column_var.set(settings.get("merge_source_column", True))
+        self.open_after_export_var.set(settings.get("open_after_export", True))
+        self.compression_var.set(settings.get("columnar_compression", "zstd"))
\ No newline at end of file
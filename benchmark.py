@@ -0,0 +1,240 @@
+"""
+Benchmarks for the DataModel and preview hot paths.
+
+Every case runs on a synthetic table (see generate_table) and is timed several times; the
+minimum and median wall time of each case are written to JSON. Passing an earlier result
+file as --baseline compares the two runs and exits with status 1 if any case got slower than
+the tolerance allows:
+
+    python benchmark.py --rows 200000 --output before.json
+    python benchmark.py --rows 200000 --output after.json --baseline before.json --tolerance 0.2
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_model import DataModel, PYARROW_AVAILABLE
+from search_index import build_search_strings, match_rows
+from sort_index import build_sort_key, sort_permutation
+from utils import detect_delimiter, format_preview_rows
+
+DTYPES = ("int", "float", "str", "category", "date")
+TEXT_VARIANTS = ("csv", "tsv", "semicolon", "pipe", "markdown", "quoted")
+PREVIEW_WINDOW_ROWS = 60 # About one screen of the preview plus its render buffer
+
+
+def generate_table(rows: int, columns: int, dtypes=DTYPES, null_ratio: float = 0.05, duplicate_ratio: float = 0.1, seed: int = 0):
+    """
+    A DataFrame of rows x columns cycling through dtypes, with null_ratio of the cells empty,
+    duplicate_ratio of the rows copies of earlier rows, and a fully empty row every 1000 rows.
+    """
+    rng = np.random.default_rng(seed)
+    unique_rows = max(1, rows - int(rows * duplicate_ratio))
+    data = {}
+    for i in range(columns):
+        kind = dtypes[i % len(dtypes)]
+        name = f"{kind.title()} Column {i}"
+        if kind == "int":
+            values = pd.Series(rng.integers(0, 1_000_000, unique_rows)).astype("Int64")
+        elif kind == "float":
+            values = pd.Series(rng.normal(1000, 250, unique_rows).round(2))
+        elif kind == "str":
+            values = pd.Series(rng.integers(0, unique_rows, unique_rows)).map("item {}, text".format)
+        elif kind == "category":
+            values = pd.Series(rng.choice(["north", "south", "east", "west"], unique_rows))
+        else:
+            values = pd.Series(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 2000, unique_rows), unit="D")).dt.strftime("%Y-%m-%d")
+        values[rng.random(unique_rows) < null_ratio] = None
+        data[name] = values
+    df = pd.DataFrame(data)
+    if rows > unique_rows:
+        df = pd.concat([df, df.sample(rows - unique_rows, replace=True, random_state=seed)], ignore_index=True)
+    df.iloc[::1000] = None
+    return df
+
+
+def render_text(df, variant: str):
+    """
+    The table as pasted text in one of TEXT_VARIANTS. "quoted" quotes every field, so the
+    embedded commas of the text columns only parse correctly with the quote character set.
+    """
+    if variant == "markdown":
+        table = df.astype(object).where(df.notna(), "").astype(str)
+        lines = ["| " + " | ".join(map(str, df.columns)) + " |", "|" + "---|" * df.shape[1]]
+        lines += ["| " + " | ".join(row) + " |" for row in table.itertuples(index=False, name=None)]
+        return "\n".join(lines) + "\n"
+    if variant == "quoted":
+        return df.to_csv(index=False, quoting=csv.QUOTE_ALL)
+    delimiter = {"csv": ",", "tsv": "\t", "semicolon": ";", "pipe": "|"}[variant]
+    # Without quoting, the text columns must not contain the delimiter
+    safe = df.replace(",", "", regex=True) if delimiter == "," else df
+    return safe.to_csv(index=False, sep=delimiter, quoting=csv.QUOTE_MINIMAL)
+
+
+def _parse_settings(variant: str):
+    """
+    (delimiter, header_row, skip_rows, quote_char) for load_data_from_string.
+    """
+    delimiter = {"markdown": "|", "quoted": ",", "csv": ",", "tsv": "\t", "semicolon": ";", "pipe": "|"}[variant]
+    return delimiter, 0, 0, '"' if variant == "quoted" else None
+
+
+def time_case(run, setup=None, repeat: int = 5):
+    """
+    Wall times of run(state) over repeat runs; setup() builds a fresh state for every run and is not timed.
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+def _loaded_model(df):
+    model = DataModel()
+    model.set_dataframe(df.copy())
+    return model
+
+
+def build_cases(df, output_dir: str):
+    """
+    (name, run, setup) of every benchmark case, in the order they are run.
+    """
+    cases = []
+    texts = {variant: render_text(df, variant) for variant in TEXT_VARIANTS}
+    cases.append(("detect_delimiter", lambda _: detect_delimiter(texts["csv"]), None))
+    for variant, text in texts.items():
+        settings = _parse_settings(variant)
+        # A new model every run, so the parse cache never answers instead of the parser
+        cases.append((f"load_data_from_string[{variant}]", lambda model, text=text, settings=settings: model.load_data_from_string(text, *settings), DataModel))
+
+    loaded = lambda: _loaded_model(df)
+    cases += [
+        ("remove_empty_rows", lambda model: model.remove_empty_rows(), loaded),
+        ("remove_duplicate_rows", lambda model: model.remove_duplicate_rows(), loaded),
+        ("remove_empty_and_duplicate_rows", lambda model: model.remove_empty_and_duplicate_rows(), loaded),
+        ("normalize_column_names", lambda model: model.normalize_column_names(), loaded),
+        ("fill_na_global", lambda model: model.fill_na_global("N/A"), loaded),
+        ("count_matches", lambda model: model.count_matches("item 1"), loaded),
+        ("replace_values[literal]", lambda model: model.replace_values("item 1", "thing 1"), loaded),
+        ("replace_values[regex]", lambda model: model.replace_values(r"item (\d+),", r"\1:", use_regex=True), loaded),
+        ("delete_rows_by_indices", lambda model: model.delete_rows_by_indices(list(range(0, len(df), 10))), loaded),
+        ("update_cell", lambda model: model.update_cell(len(df) // 2, df.columns[0], "42"), loaded),
+        ("undo", lambda model: model.undo(), lambda: _removed_duplicates(df)),
+    ]
+
+    exports = [("export_to_excel", "xlsx"), ("export_to_csv", "csv")]
+    if PYARROW_AVAILABLE:
+        exports += [("export_to_parquet", "parquet"), ("export_to_feather", "feather")]
+    model = _loaded_model(df)
+    for method, extension in exports:
+        path = os.path.join(output_dir, f"benchmark.{extension}")
+        cases.append((method, lambda _, method=method, path=path: _check(getattr(model, method)(path)), None))
+
+    # The DataFrame side of AppView.update_preview: formatting the rendered window, at the top and
+    # in the middle of the table, plainly and through a search/sort row order
+    middle = max(0, len(df) // 2 - PREVIEW_WINDOW_ROWS // 2)
+    strings = build_search_strings(df.iloc[:, 2 % df.shape[1]])
+    order = sort_permutation([build_sort_key(df.iloc[:, 0])], [False])
+    cases += [
+        ("update_preview[top]", lambda _: format_preview_rows(df, 0, PREVIEW_WINDOW_ROWS), None),
+        ("update_preview[middle]", lambda _: format_preview_rows(df, middle, middle + PREVIEW_WINDOW_ROWS), None),
+        ("update_preview[sorted]", lambda _: format_preview_rows(df, middle, middle + PREVIEW_WINDOW_ROWS, order), None),
+        ("search[literal]", lambda _: match_rows(strings, "item 1", False), None),
+        ("search[regex]", lambda _: match_rows(strings, r"item \d{3},", True), None),
+        ("sort[build_key]", lambda _: build_sort_key(df.iloc[:, 0]), None),
+    ]
+    return cases
+
+
+def _removed_duplicates(df):
+    model = _loaded_model(df)
+    model.remove_duplicate_rows()
+    return model
+
+
+def _check(result):
+    success, message = result
+    if not success:
+        raise RuntimeError(message)
+
+
+def run_benchmarks(rows: int, columns: int, null_ratio: float, duplicate_ratio: float, repeat: int, only=None, seed: int = 0):
+    df = generate_table(rows, columns, null_ratio=null_ratio, duplicate_ratio=duplicate_ratio, seed=seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name, run, setup in build_cases(df, output_dir):
+            if only and not any(pattern in name for pattern in only):
+                continue
+            results[name] = time_case(run, setup, repeat)
+            logging.info(f"{name}: {results[name]['min'] * 1000:.1f} ms (median {results[name]['median'] * 1000:.1f} ms)")
+    return {
+        "meta": {
+            "rows": rows, "columns": columns, "null_ratio": null_ratio, "duplicate_ratio": duplicate_ratio,
+            "repeat": repeat, "seed": seed, "python": platform.python_version(), "pandas": pd.__version__,
+            "pyarrow": PYARROW_AVAILABLE, "platform": platform.platform(), "time": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance: float, min_delta: float = 0.005):
+    """
+    Names of the cases whose minimum time grew by more than tolerance (a fraction) over the baseline,
+    and by at least min_delta seconds, so timer noise on sub-millisecond cases is not a regression.
+    Only cases present in both runs are compared.
+    """
+    regressions = []
+    for name, timing in results["results"].items():
+        before = baseline["results"].get(name)
+        if before and timing["min"] > before["min"] * (1 + tolerance) and timing["min"] - before["min"] >= min_delta:
+            regressions.append(name)
+            logging.error(f"回归: {name} {before['min'] * 1000:.1f} ms -> {timing['min'] * 1000:.1f} ms")
+    if baseline.get("meta", {}).get("rows") != results["meta"]["rows"]:
+        logging.warning("基准文件的行数与本次运行不同，比较结果可能没有意义。")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Mark Excel DataModel and preview hot paths.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--null-ratio", type=float, default=0.05)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="Only run cases whose name contains one of these")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown over the baseline, as a fraction")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Slowdowns smaller than this many seconds are never regressions")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    results = run_benchmarks(args.rows, args.columns, args.null_ratio, args.duplicate_ratio, args.repeat, args.only, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=4)
+    logging.info(f"结果已写入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance, args.min_delta):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+import itertools
+import threading
+
+_tokens = itertools.count()
+
+
+class ColumnCache:
+    """
+    Per-column derived data (profiles, search strings) by column position. Every column slot carries
+    a token that changes whenever the column is invalidated, so a value computed in the background is
+    only stored if its column is still unchanged when the result arrives, wherever columns have moved
+    in the meantime.
+    """
+    def __init__(self):
+        self._values = []
+        self._tokens = []
+        self._lock = threading.Lock() # The app only uses it from the UI thread; other callers may not
+
+    def reset(self, column_count: int):
+        with self._lock:
+            self._values = [None] * column_count
+            self._tokens = [next(_tokens) for _ in range(column_count)]
+
+    def get(self, position: int):
+        with self._lock:
+            return self._values[position], self._tokens[position]
+
+    def put(self, token, value):
+        """
+        Stores value for the column that still has this token. Returns its position, or None if stale.
+        """
+        with self._lock:
+            if token not in self._tokens:
+                return None
+            position = self._tokens.index(token)
+            self._values[position] = value
+            return position
+
+    def apply(self, change, column_count: int):
+        """
+        Invalidates only the columns a TableChange touched.
+        """
+        if change.full:
+            self.reset(column_count)
+            return
+        with self._lock:
+            if change.rows_removed is not None or change.rows_inserted is not None:
+                touched = range(len(self._values)) if len(change.rows_removed if change.rows_removed is not None else change.rows_inserted) else []
+            else:
+                touched = change.cells.keys()
+            for position in touched:
+                self._values[position] = None
+                self._tokens[position] = next(_tokens)
+            for position in sorted(change.columns_removed or [], reverse=True):
+                del self._values[position]
+                del self._tokens[position]
+            for position in sorted(change.columns_inserted or []):
+                self._values.insert(position, None)
+                self._tokens.insert(position, next(_tokens))
+
+    def sync(self, column_count: int):
+        # Safety net for frames replaced without going through set_dataframe
+        if len(self._values) != column_count:
+            self.reset(column_count)
@@ -1,105 +1,913 @@
+import numpy as np
 import pandas as pd
 from io import StringIO
+from collections import OrderedDict
+import csv
+import datetime
+import hashlib
+import importlib.util
+import logging
+import os
+import threading
+import time
 import re
+from utils import MARKDOWN_ALIGNMENT_ROW, is_markdown_table, format_bytes
+from undo_history import frame_nbytes, TableChange, UndoHistory, RowsRemoved, ColumnsRemoved, ColumnsRenamed, CellsFilled, CellsReplaced, CellEdited
+from job_runner import JobCancelled
+from hash_index import RowHashIndex
+from column_cache import ColumnCache
+from find_replace import FindSpec, is_text_dtype, match_cells, replacements
+
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+ENGINE_SAMPLE_CHARS = 64 * 1024
+COLUMNAR_FORMATS = {'.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+COLUMNAR_COMPRESSIONS = ['zstd', 'lz4', 'none'] # Supported by both Parquet and Feather
+PYARROW_MISSING_MESSAGE = "Parquet/Feather 需要安装 pyarrow (pip install pyarrow)。"
+CATEGORY_MAX_UNIQUE_RATIO = 0.5 # Text columns with fewer distinct values than this share of rows become category
+CATEGORY_SAMPLE_ROWS = 10000
+EXCEL_MAX_ROWS = 1048576 # Per sheet, including the header row
+EXPORT_CHUNK_ROWS = 50000
+PYARROW_TEMPORAL = re.compile(r'\d{4}-\d\d-\d\d|\d\d:\d\d') # ISO dates and HH:MM times, which pyarrow converts
+
+class ParseCache:
+    """
+    LRU cache of parsed DataFrames, keyed on a hash of the input text plus the parse settings.
+    """
+    def __init__(self, max_entries: int = 8, max_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock() # Parses run on worker threads
+
+    @staticmethod
+    def make_key(data_string: str, *settings):
+        digest = hashlib.blake2b(data_string.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+        return (digest, len(data_string)) + settings
+
+    @staticmethod
+    def make_file_key(file_path: str, *settings):
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size) + settings
+
+    def get(self, key):
+        with self._lock:
+            df = self._entries.get(key)
+            if df is None:
+                return None
+            self._entries.move_to_end(key)
+        # A shallow copy: copy-on-write keeps the cached data unchanged by edits to the one handed out,
+        # and the cached object itself keeps its own columns and index
+        return df.copy(deep=False)
+
+    def put(self, key, df):
+        size = int(df.memory_usage(index=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._entries[key] = df
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            while len(self._entries) > self.max_entries or sum(self._sizes.values()) > self.max_bytes:
+                evicted, _ = self._entries.popitem(last=False)
+                del self._sizes[evicted]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+
+def remove_partial(temp_path: str):
+    try:
+        os.remove(temp_path)
+    except OSError:
+        pass
+
+def snake_case(name):
+    return '_'.join(
+        re.sub('([A-Z][a-z]+)', r' \1',
+        re.sub('([A-Z]+)', r' \1',
+        name.replace('-', ' '))).split()).lower()
+
+def compact_parsed(df, message: str, compact: bool):
+    """
+    (df, message) of a fresh parse; with compact=True the dtypes are shrunk and the saving appended to message.
+    """
+    if not compact:
+        return df, message
+    before = frame_nbytes(df)
+    df = DataModel.compact_dtypes(df)
+    return df, f"{message} 内存: {format_bytes(before)} → {format_bytes(frame_nbytes(df))}"
+
+def subset_positions(columns, subset):
+    """
+    Positions of the columns named in a dedup subset. Like drop_duplicates, raises KeyError for
+    names that are not among columns (e.g. a recipe replayed after the columns were renamed).
+    """
+    missing = [col for col in subset if col not in columns]
+    if missing:
+        raise KeyError(missing)
+    if not len(subset):
+        raise ValueError("去重至少需要选择一列。")
+    return [i for i, col in enumerate(columns) if col in subset]
+
+def _is_number(dtype):
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+def _has_plain_text(column, head: int = 1000):
+    """
+    Whether column holds a value no CSV engine reads as a number or boolean, which keeps
+    the whole column text. The head is tried first; a text column seldom makes us look further.
+    """
+    for part in (column.iloc[:head], column):
+        values = part.dropna()
+        text = values[pd.to_numeric(values, errors='coerce').isna()].str.strip()
+        if (~text.str.lower().isin(['true', 'false'])).any():
+            return True
+    return False
+
+def _common_prefix_length(a: str, b: str, block: int = 64 * 1024):
+    """
+    Length of the longest common prefix of a and b. Whole blocks are compared in C;
+    only the block holding the first difference is scanned character by character.
+    """
+    limit = min(len(a), len(b))
+    start = 0
+    while start < limit:
+        stop = min(start + block, limit)
+        if not a.startswith(b[start:stop], start):
+            return next(i for i in range(start, stop) if a[i] != b[i])
+        start = stop
+    return limit
+
+class ExcelStreamWriter:
+    """
+    Appends DataFrame chunks to a write-only openpyxl workbook, starting a new sheet
+    (with the header repeated) whenever Excel's row limit is reached.
+    """
+    def __init__(self, columns):
+        from openpyxl import Workbook
+        self.workbook = Workbook(write_only=True)
+        self.header = [str(col) for col in columns]
+        self.rows_per_sheet = EXCEL_MAX_ROWS - 1
+        self.rows = 0
+        self._sheet = None
+
+    @property
+    def sheets(self):
+        return len(self.workbook.worksheets)
+
+    def append_frame(self, df):
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if self.rows % self.rows_per_sheet == 0:
+                self._sheet = self.workbook.create_sheet(f"Sheet{self.rows // self.rows_per_sheet + 1}")
+                self._sheet.append(self.header)
+            self._sheet.append(row)
+            self.rows += 1
+
+    def save(self, file_path: str):
+        if self._sheet is None: # Header-only table
+            self.workbook.create_sheet("Sheet1").append(self.header)
+        self.workbook.save(file_path)
+
+class _Staged:
+    """
+    A DataModel attribute that a thread inside run_staged sees its own working copy of.
+    """
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, model, owner=None):
+        if model is None:
+            return self
+        staged = getattr(model._staging, "state", None)
+        return model.__dict__[self.name] if staged is None else getattr(staged, self.name)
+
+    def __set__(self, model, value):
+        staged = getattr(model._staging, "state", None)
+        if staged is None:
+            model.__dict__[self.name] = value
+        else:
+            setattr(staged, self.name, value)
+
+class StagedState:
+    """
+    What an operation run by DataModel.run_staged changed: its own table, undo history and row hash
+    index, built from copies of the model's, plus last_change. DataModel.commit makes it the model's
+    and only then invalidates the column caches for its changes.
+    """
+    def __init__(self, df, history, hash_index):
+        self.df = df
+        self.history = history
+        self.hash_index = hash_index
+        self.last_change = None
+        self.changes = [] # (TableChange, column count after it) for the column caches
 
 class DataModel:
+    # On a thread inside run_staged these are that thread's working copies (see StagedState)
+    df = _Staged()
+    history = _Staged()
+    hash_index = _Staged()
+    last_change = _Staged()
+
     def __init__(self):
+        self._staging = threading.local()
         self.df = pd.DataFrame()
+        self.parse_cache = ParseCache()
+        self.history = UndoHistory()
+        self.hash_index = RowHashIndex()
+        self.profiles = ColumnCache()
+        self.search_strings = ColumnCache()
+        self.sort_keys = ColumnCache()
+        self.last_change = None # TableChange of the operations since the caller last reset it to None
+
+    def run_staged(self, operation, *args):
+        """
+        Runs operation on the calling (worker) thread against a StagedState: the frames, history
+        entries and hash updates it makes are only seen by this thread, so the UI's table and undo
+        stack never change under it, and an operation that fails partway leaves them untouched.
+        Returns (result, state) for commit() to apply on the UI thread.
+        """
+        state = StagedState(self.df, self.history.copy(), self.hash_index.copy())
+        self._staging.state = state
+        try:
+            return operation(*args), state
+        finally:
+            self._staging.state = None
+
+    def commit(self, state: StagedState):
+        self.df, self.history, self.hash_index = state.df, state.history, state.hash_index
+        # Together with the frame, so a cache token never pairs a column of one frame with the other
+        for change, column_count in state.changes:
+            self._invalidate_caches(change, column_count)
 
     def load_data_from_string(self, data_string: str, delimiter: str, header_row: int, skip_rows: int, quote_char: str):
+        success, message, df = self.parse_string(data_string, delimiter, header_row, skip_rows, quote_char)
+        if success:
+            # On failure, keep the old dataframe instead of an empty one
+            self.set_dataframe(df)
+        return success, message
+
+    def parse_string(self, data_string: str, delimiter: str, header_row: int, skip_rows: int, quote_char: str, compact: bool = False):
+        """
+        Parses data_string without touching self.df, so it can run on a worker thread.
+        With compact=True the column dtypes are shrunk afterwards (see compact_dtypes).
+        Returns (success, message, df).
+        """
         if not data_string.strip():
-            self.df = pd.DataFrame()
-            return True, "输入为空，预览已清空。"
+            return True, "输入为空，预览已清空。", pd.DataFrame()
+
+        cache_key = ParseCache.make_key(data_string, delimiter, header_row, skip_rows, quote_char, compact)
+        cached = self.parse_cache.get(cache_key)
+        if cached is not None:
+            return True, "数据加载成功（缓存）。", cached
         
         try:
-            self.df = pd.read_csv(
-                StringIO(data_string),
-                sep=delimiter,
-                header=header_row,
-                skiprows=skip_rows,
-                quotechar=quote_char,
-                skipinitialspace=True,
-                engine='python' # Python engine is more robust for various delimiters
-            )
+            sample = data_string[:ENGINE_SAMPLE_CHARS]
+            if delimiter == '|' and is_markdown_table(sample):
+                df = self._parse_markdown_table(lambda: StringIO(data_string), sample, header_row, skip_rows)
+            else:
+                df = self._read_csv(lambda: StringIO(data_string), sample, delimiter, header_row, skip_rows, quote_char)
             # After loading, remove columns that are all NaN (often artifacts of bad parsing)
-            self.df.dropna(axis=1, how='all', inplace=True)
-            return True, "数据加载成功。"
+            df.dropna(axis=1, how='all', inplace=True)
+            df, message = compact_parsed(df, "数据加载成功。", compact)
+            self.parse_cache.put(cache_key, df)
+            return True, message, df.copy(deep=False)
         except Exception as e:
-            # On failure, keep the old dataframe instead of an empty one
-            return False, f"数据解析失败: {e}"
+            return False, f"数据解析失败: {e}", None
+
+    def parse_appended(self, previous_text: str, previous_df, data_string: str, delimiter: str, header_row: int, skip_rows: int, quote_char):
+        """
+        Reparses only the end of data_string that differs from previous_text, which parse_string
+        turned into previous_df with the same settings (and compact=False). The lines from the first
+        changed one onwards are parsed on their own and replace the rows they used to produce.
+        Returns (success, message, df), or None if only a full parse is sure to give the same
+        result: the change reaches the header, a quoted field may span the cut, the new lines do
+        not fit the existing columns, or dropping rows could change a column's dtype.
+        """
+        sample = data_string[:ENGINE_SAMPLE_CHARS]
+        if previous_df is None or previous_df.empty or not data_string.strip() or (delimiter == '|' and is_markdown_table(sample)):
+            return None
+
+        prefix = _common_prefix_length(previous_text, data_string)
+        if prefix == len(previous_text) and data_string.startswith('\n', prefix):
+            cut = prefix + 1 # The old last line was complete
+        else:
+            cut = previous_text.rfind('\n', 0, prefix) + 1
+        header_end = 0
+        for _ in range(skip_rows + header_row + 1):
+            line_end = data_string.find('\n', header_end, cut)
+            # Blank lines would make read_csv count the header lines differently
+            if line_end < 0 or not data_string[header_end:line_end].strip():
+                return None
+            header_end = line_end + 1
+        if quote_char is not None and data_string.count(quote_char, 0, cut) % 2:
+            return None
+
+        string_columns = [i for i, dtype in enumerate(previous_df.dtypes) if isinstance(dtype, pd.StringDtype)]
+        try:
+            removed = self._parse_lines(previous_text[cut:], sample, delimiter, quote_char)
+            added = self._parse_lines(data_string[cut:], sample, delimiter, quote_char, dtype={i: str for i in string_columns})
+        except Exception:
+            return None
+        kept = len(previous_df) - len(removed)
+        if kept <= 0:
+            return None
+        if added.shape[1] != previous_df.shape[1] and not added.empty:
+            return None
+        for i, dtype in enumerate(previous_df.dtypes):
+            if added.empty:
+                break
+            column = added.iloc[:, i]
+            if column.dtype == dtype or (_is_number(dtype) and _is_number(column.dtype)):
+                continue
+            if not column.isna().all() or not _is_number(dtype):
+                return None
+
+        df = previous_df.iloc[:kept]
+        if not added.empty:
+            df = pd.concat([df, added.set_axis(previous_df.columns, axis=1)], ignore_index=True)
+        if kept < len(previous_df):
+            # The removed rows may have been what made a column float, text or non-empty
+            for i, dtype in enumerate(df.dtypes):
+                column = df.iloc[:, i]
+                if isinstance(dtype, pd.StringDtype):
+                    if not _has_plain_text(column):
+                        return None
+                elif column.isna().all():
+                    return None
+                elif pd.api.types.is_float_dtype(dtype) and column.notna().all() and np.all(np.mod(column.to_numpy(), 1) == 0):
+                    return None
+        logging.info(f"增量解析: 保留 {kept} 行, 重新解析 {len(added)} 行")
+        return True, f"数据加载成功（增量解析 {len(added)} 行）。", df
+
+    def _parse_lines(self, text: str, sample: str, delimiter: str, quote_char, **read_options):
+        """
+        Parses header-less data lines, as cut from a text that parse_string has already seen.
+        """
+        if not text.strip('\r\n'):
+            return pd.DataFrame() # Only line breaks, which every engine skips; a line of spaces may still be a row
+        if not text.endswith('\n'):
+            text += '\n' # pyarrow cannot infer the columns of a lone unterminated line
+        return self._read_csv(lambda: StringIO(text), sample, delimiter, None, 0, quote_char, **read_options)
+
+    def parse_file(self, file_path: str, encoding: str, delimiter: str, header_row: int, skip_rows: int, quote_char: str, sample: str = "", compact: bool = False):
+        """
+        Parses a file straight from disk, without ever holding its full text in memory.
+        sample should be the decoded head of the file; it only guides engine selection.
+        Returns (success, message, df).
+        """
+        try:
+            cache_key = ParseCache.make_file_key(file_path, encoding, delimiter, header_row, skip_rows, quote_char, compact)
+            cached = self.parse_cache.get(cache_key)
+            if cached is not None:
+                return True, "数据加载成功（缓存）。", cached
+
+            if delimiter == '|' and is_markdown_table(sample):
+                df = self._parse_markdown_table(lambda: file_path, sample, header_row, skip_rows, encoding=encoding)
+            else:
+                df = self._read_csv(lambda: file_path, sample, delimiter, header_row, skip_rows, quote_char, encoding=encoding, memory_map=True)
+            df.dropna(axis=1, how='all', inplace=True)
+            df, message = compact_parsed(df, "数据加载成功。", compact)
+            self.parse_cache.put(cache_key, df)
+            return True, message, df.copy(deep=False)
+        except Exception as e:
+            return False, f"数据解析失败: {e}", None
+
+    @staticmethod
+    def columnar_format(file_path: str):
+        return COLUMNAR_FORMATS.get(os.path.splitext(file_path)[1].lower())
+
+    def read_columnar_schema(self, file_path: str):
+        """
+        Reads only the footer/schema of a Parquet or Feather file. Returns "name: type" lines.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            return None
+        try:
+            if self.columnar_format(file_path) == 'parquet':
+                schema = pq.read_schema(file_path)
+            else:
+                with pa.memory_map(file_path) as source:
+                    schema = pa.ipc.open_file(source).schema
+        except Exception:
+            return None
+        return "\n".join(f"{field.name}: {field.type}" for field in schema)
+
+    def parse_columnar_file(self, file_path: str, compact: bool = False):
+        """
+        Loads a Parquet or Feather file with its stored dtypes; no text parsing is involved.
+        Returns (success, message, df).
+        """
+        try:
+            cache_key = ParseCache.make_file_key(file_path, 'columnar', compact)
+            cached = self.parse_cache.get(cache_key)
+            if cached is not None:
+                return True, "数据加载成功（缓存）。", cached
+
+            start = time.perf_counter()
+            if self.columnar_format(file_path) == 'parquet':
+                df = pd.read_parquet(file_path)
+            else:
+                df = pd.read_feather(file_path)
+            logging.info(f"列式读取: {os.path.basename(file_path)}, 耗时 {(time.perf_counter() - start) * 1000:.1f} ms, {len(df)} 行")
+            df, message = compact_parsed(df, "数据加载成功。", compact)
+            self.parse_cache.put(cache_key, df)
+            return True, message, df.copy(deep=False)
+        except ImportError:
+            return False, PYARROW_MISSING_MESSAGE, None
+        except Exception as e:
+            return False, f"数据解析失败: {e}", None
+
+    @staticmethod
+    def compact_dtypes(df):
+        """
+        Returns df with smaller dtypes: integers downcast, whole-number floats turned into
+        (nullable, if there are NAs) integers, lossless float32, and repetitive text as category.
+        """
+        return pd.DataFrame({i: DataModel._compact_column(df.iloc[:, i]) for i in range(df.shape[1])}, index=df.index).set_axis(df.columns, axis=1)
+
+    @staticmethod
+    def _compact_column(column):
+        dtype = column.dtype
+        if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+            return column
+        if pd.api.types.is_integer_dtype(dtype):
+            return pd.to_numeric(column, downcast='integer')
+        if pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+            values = column.to_numpy()
+            valid = values[~np.isnan(values)]
+            if len(valid) and np.all(np.isfinite(valid)) and np.all(np.mod(valid, 1) == 0) and np.abs(valid).max() < 2**53:
+                smallest = pd.to_numeric(pd.Series(valid.astype(np.int64)), downcast='integer').dtype
+                return column.astype(smallest if len(valid) == len(values) else smallest.name.capitalize())
+            as_float32 = values.astype(np.float32)
+            if np.array_equal(as_float32.astype(np.float64), values, equal_nan=True):
+                return column.astype(np.float32)
+            return column
+        if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            # A cheap look at the head rules out mostly-unique columns before hashing everything
+            if column.iloc[:CATEGORY_SAMPLE_ROWS].nunique() > CATEGORY_MAX_UNIQUE_RATIO * min(len(column), CATEGORY_SAMPLE_ROWS):
+                return column
+            if column.nunique() > CATEGORY_MAX_UNIQUE_RATIO * len(column):
+                return column
+            categorical = column.astype('category')
+            if categorical.memory_usage(deep=True) < column.memory_usage(deep=True):
+                return categorical
+        return column
+
+    @staticmethod
+    def _markdown_layout(sample: str, skip_rows: int):
+        """
+        Scans the head of a pipe table once. Returns the line numbers read_csv should skip
+        (leading prose and |---| alignment rows) and whether rows carry border pipes.
+        """
+        skip_lines = list(range(skip_rows))
+        leading_pipe = trailing_pipe = None
+        in_table = False
+        for number, line in enumerate(StringIO(sample)):
+            if number < skip_rows:
+                continue
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if not in_table and '|' not in stripped:
+                skip_lines.append(number)
+            elif re.match(MARKDOWN_ALIGNMENT_ROW, stripped):
+                skip_lines.append(number)
+            elif leading_pipe is None:
+                in_table = True
+                leading_pipe, trailing_pipe = stripped.startswith('|'), stripped.endswith('|')
+        return skip_lines, bool(leading_pipe), bool(trailing_pipe)
+
+    def _parse_markdown_table(self, open_source, sample: str, header_row: int, skip_rows: int, encoding: str = None):
+        """
+        Reads a Markdown pipe table with the C parser. Alignment rows are skipped and the
+        empty border columns are dropped explicitly, rather than being parsed as data.
+        """
+        start = time.perf_counter()
+        skip_lines, leading_pipe, trailing_pipe = self._markdown_layout(sample, skip_rows)
+        options = dict(sep='|', header=header_row, skiprows=skip_lines, quoting=csv.QUOTE_NONE,
+                       escapechar='\\', skipinitialspace=True, engine='c')
+        if encoding:
+            options.update(encoding=encoding, encoding_errors='replace')
+        df = pd.read_csv(open_source(), **options)
+
+        if trailing_pipe and len(df.columns) > 1:
+            df = df.iloc[:, :-1]
+        if leading_pipe and len(df.columns) > 1:
+            df = df.iloc[:, 1:]
+        # skipinitialspace only trims the left side of each cell
+        df.columns = [col.strip() if isinstance(col, str) else col for col in df.columns]
+        for i in range(df.shape[1]):
+            col = df.iloc[:, i]
+            if col.dtype == object or pd.api.types.is_string_dtype(col.dtype):
+                df.isetitem(i, col.str.rstrip())
+        logging.info(f"解析引擎: markdown, 耗时 {(time.perf_counter() - start) * 1000:.1f} ms, {len(df)} 行")
+        return df
+
+    @staticmethod
+    def _candidate_engines(sample: str, delimiter: str, quote_char):
+        # Multi-character separators are regular expressions, which only the Python engine supports
+        if len(delimiter) != 1:
+            return ['python']
+        engines = []
+        # pyarrow has no skipinitialspace/quoting options, so only use it when they make no difference.
+        # It also turns ISO dates and times into date/time values ('10:30' comes back as '10:30:00'),
+        # where the other engines keep the text as typed
+        if PYARROW_AVAILABLE and quote_char is not None and f"{delimiter} " not in sample and not PYARROW_TEMPORAL.search(sample):
+            engines.append('pyarrow')
+        return engines + ['c', 'python']
+
+    @staticmethod
+    def _pyarrow_misread(df):
+        """
+        Why the other engines would read df differently, or None: pyarrow turns dates and times into
+        date/time values, and integers beyond int64 into (rounded) floats where the C engine keeps uint64.
+        """
+        for i, dtype in enumerate(df.dtypes):
+            if pd.api.types.is_datetime64_any_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+                return "日期/时间列"
+            if dtype == object:
+                # An Arrow column has a single type, so its first value tells
+                values = df.iloc[:, i].dropna()
+                if not values.empty and isinstance(values.iloc[0], (datetime.date, datetime.time)):
+                    return "日期/时间列"
+            elif pd.api.types.is_float_dtype(dtype) and (np.abs(df.iloc[:, i].to_numpy()) >= 2.0 ** 63).any():
+                return "超出 int64 的整数列"
+        return None
+
+    def _read_csv(self, open_source, sample: str, delimiter: str, header_row: int, skip_rows: int, quote_char, encoding: str = None, memory_map: bool = False, **read_options):
+        """
+        Tries the fastest engine compatible with the settings first, falling back to the Python engine.
+        open_source must return a fresh source on every call, since a failed attempt consumes it.
+        read_options are passed on to every read_csv attempt.
+        """
+        engines = self._candidate_engines(sample, delimiter, quote_char)
+        if 'dtype' in read_options:
+            # pyarrow applies dtype only after inferring its own types ('007' would come back as '7')
+            engines = [engine for engine in engines if engine != 'pyarrow']
+        for engine in engines:
+            options = dict(sep=delimiter, header=header_row, skiprows=skip_rows, engine=engine, **read_options)
+            if encoding:
+                options['encoding'] = encoding
+                if engine != 'pyarrow':
+                    # A stray undecodable byte should not fail the whole file
+                    options['encoding_errors'] = 'replace'
+            if memory_map and engine == 'c':
+                options['memory_map'] = True
+            if quote_char is None:
+                options['quoting'] = csv.QUOTE_NONE
+            else:
+                options['quotechar'] = quote_char
+            if engine != 'pyarrow':
+                options['skipinitialspace'] = True
+            start = time.perf_counter()
+            try:
+                df = pd.read_csv(open_source(), **options)
+                misread = self._pyarrow_misread(df) if engine == 'pyarrow' else None
+                if misread:
+                    raise ValueError(misread) # Keep the values as the other engines read them
+            except Exception as e:
+                if engine == engines[-1]:
+                    raise
+                logging.warning(f"解析引擎 {engine} 失败，尝试下一个引擎: {e}")
+                continue
+            logging.info(f"解析引擎: {engine}, 耗时 {(time.perf_counter() - start) * 1000:.1f} ms, {len(df)} 行")
+            return df
+
+    def set_dataframe(self, df):
+        self.df = df
+        self.history.clear()
+        self.hash_index.reset(df)
+        self.profiles.reset(df.shape[1])
+        self.search_strings.reset(df.shape[1])
+        self.sort_keys.reset(df.shape[1])
+        self.last_change = TableChange(full=True)
 
     def clear_data(self):
-        self.df = pd.DataFrame()
+        self.set_dataframe(pd.DataFrame())
 
     def get_dataframe(self):
         return self.df
 
+    def _push(self, delta, op: str = None, *args):
+        # op/args name the DataModel method that can replay this change (see recipes.py)
+        self.history.push(delta, {"op": op, "args": list(args)} if op else None)
+        self._record_change(delta.change(undone=False))
+
+    def _record_change(self, change):
+        staged = getattr(self._staging, "state", None)
+        if staged is None:
+            self._invalidate_caches(change, self.df.shape[1])
+        else:
+            staged.changes.append((change, self.df.shape[1]))
+        # Several operations in a row (e.g. a recipe) are not worth merging; the view just rebuilds
+        self.last_change = change if self.last_change is None else TableChange(full=True)
+
+    def _invalidate_caches(self, change, column_count: int):
+        self.profiles.apply(change, column_count)
+        self.search_strings.apply(change, column_count)
+        self.sort_keys.apply(change, column_count)
+
+    def _remove_rows(self, mask, message_template, op=None, reset_index=False, args=()):
+        """
+        Drops the rows flagged in the boolean mask and records them for undo.
+        """
+        positions = np.flatnonzero(mask)
+        old_index = self.df.index if reset_index else None
+        message = message_template.format(rows=len(positions))
+        self._push(RowsRemoved(message, positions, self.df.iloc[positions], old_index), op, *args)
+        self.hash_index.remove_rows(positions)
+        if len(positions):
+            self.df = self.df.take(np.flatnonzero(~mask))
+        if reset_index:
+            self.df = self.df.reset_index(drop=True)
+        return message
+
     def remove_empty_rows(self):
-        initial_rows = len(self.df)
-        self.df.dropna(how='all', inplace=True)
-        rows_removed = initial_rows - len(self.df)
-        return f"移除了 {rows_removed} 行空行。"
+        return self._remove_rows(self.df.isna().all(axis=1).to_numpy(), "移除了 {rows} 行空行。", op="remove_empty_rows")
+
+    def remove_duplicate_rows(self, subset=None, keep='first'):
+        """
+        Removes rows whose values in the subset columns (all columns by default) repeat an
+        earlier row, or a later one with keep='last'.
+        """
+        mask = self._duplicated_mask(subset, keep)
+        # The default form is recorded without arguments so recipes can fuse it (see recipes.py)
+        args = () if subset is None and keep == 'first' else (list(subset) if subset is not None else None, keep)
+        message = "移除了 {rows} 行重复行。"
+        if args:
+            message += f" (按列: {', '.join(map(str, subset or self.df.columns))}, 保留{'第一条' if keep == 'first' else '最后一条'})"
+        return self._remove_rows(mask, message, op="remove_duplicate_rows", args=args)
+
+    def remove_empty_and_duplicate_rows(self):
+        """
+        Fused remove_empty_rows + remove_duplicate_rows (in either order) in a single pass.
+        A duplicate's first occurrence has the same values, so it is never an empty row itself.
+        """
+        mask = self.df.isna().all(axis=1).to_numpy() | self._duplicated_mask()
+        return self._remove_rows(mask, "移除了 {rows} 行空行或重复行。", op="remove_empty_and_duplicate_rows")
 
-    def remove_duplicate_rows(self):
-        initial_rows = len(self.df)
-        self.df.drop_duplicates(inplace=True)
-        rows_removed = initial_rows - len(self.df)
-        return f"移除了 {rows_removed} 行重复行。"
+    def _duplicated_mask(self, subset=None, keep='first'):
+        positions = range(self.df.shape[1]) if subset is None else subset_positions(self.df.columns, subset)
+        keys = self.hash_index.key_hashes(self.df, positions)
+        return pd.Series(keys).duplicated(keep=keep).to_numpy()
+
+    def duplicate_groups(self, subset=None, keep='first', max_groups: int = 100):
+        """
+        Previews what remove_duplicate_rows(subset, keep) would do without changing anything.
+        Returns (rows_to_remove, group_count, preview), where preview holds the rows of the first
+        max_groups duplicate groups, group by group, with the group number in a "#" column.
+        """
+        positions = range(self.df.shape[1]) if subset is None else subset_positions(self.df.columns, subset)
+        keys = pd.Series(self.hash_index.key_hashes(self.df, positions))
+        rows_to_remove = int(keys.duplicated(keep=keep).sum())
+        members = np.flatnonzero(keys.duplicated(keep=False).to_numpy())
+        codes, uniques = pd.factorize(keys.to_numpy()[members])
+        shown = codes < max_groups
+        order = np.lexsort((members[shown], codes[shown]))
+        preview = self.df.iloc[members[shown][order]].copy()
+        preview.insert(0, "#", codes[shown][order] + 1, allow_duplicates=True)
+        return rows_to_remove, len(uniques), preview
 
     def normalize_column_names(self):
-        def snake_case(s):
-            return '_'.join(
-                re.sub('([A-Z][a-z]+)', r' \1',
-                re.sub('([A-Z]+)', r' \1',
-                s.replace('-', ' '))).split()).lower()
-        self.df.columns = [snake_case(col) for col in self.df.columns]
-        return "已将所有列名规范化为蛇形命名法。"
+        old_columns = list(self.df.columns)
+        self.df = self.df.set_axis([snake_case(col) for col in self.df.columns], axis=1)
+        message = "已将所有列名规范化为蛇形命名法。"
+        self._push(ColumnsRenamed(message, old_columns, self.df.columns), "normalize_column_names")
+        return message
         
     def fill_na_global(self, fill_value: str):
-        self.df.fillna(fill_value, inplace=True)
-        return f"已将所有空值填充为 '{fill_value}'。"
+        na_mask = self.df.isna().to_numpy()
+        na_positions = {i: np.flatnonzero(na_mask[:, i]) for i in range(self.df.shape[1]) if na_mask[:, i].any()}
+        old_dtypes = {i: self.df.dtypes.iloc[i] for i in na_positions}
+        message = f"已将所有空值填充为 '{fill_value}'。"
+        delta = CellsFilled(message, fill_value, na_positions, old_dtypes)
+        # Column by column, so numeric columns can widen to hold a text fill value
+        self.df = delta.redo(self.df)
+        self._push(delta, "fill_na_global", fill_value)
+        self.hash_index.apply(delta, self.df, undone=False)
+        return message
+
+    def _text_positions(self, columns=None):
+        return [i for i in range(self.df.shape[1]) if (columns is None or self.df.columns[i] in columns) and is_text_dtype(self.df.dtypes.iloc[i])]
+
+    def count_matches(self, find: str, columns=None, use_regex: bool = False, case_sensitive: bool = False, whole_cell: bool = False):
+        """
+        Previews replace_values with the same arguments: matching cells per column name, for the
+        columns with any. Raises re.error for an invalid regex.
+        """
+        spec = FindSpec(find, use_regex, case_sensitive, whole_cell)
+        counts = {}
+        for i in self._text_positions(columns):
+            matched = int(match_cells(self.df.iloc[:, i], spec).sum())
+            if matched:
+                counts[self.df.columns[i]] = matched
+        return counts
+
+    def replace_values(self, find: str, replacement: str, columns=None, use_regex: bool = False, case_sensitive: bool = False, whole_cell: bool = False):
+        """
+        Replaces find in the text columns (str, category, object) among columns, all by default.
+        A regex replacement may refer to groups; whole_cell only replaces cells that match entirely.
+        Raises re.error for an invalid regex.
+        """
+        spec = FindSpec(find, use_regex, case_sensitive, whole_cell)
+        replaced, old_dtypes = {}, {}
+        for i in self._text_positions(columns):
+            column = self.df.iloc[:, i]
+            positions, new_values = replacements(column, spec, replacement)
+            if len(positions):
+                replaced[i] = (positions, column.iloc[positions].to_numpy(dtype=object), new_values)
+                old_dtypes[i] = column.dtype
+        cells = sum(len(positions) for positions, _, _ in replaced.values())
+        message = f"已将 {len(replaced)} 列中 {cells} 个单元格里的 '{find}' 替换为 '{replacement}'。"
+        delta = CellsReplaced(message, replaced, old_dtypes)
+        self.df = delta.redo(self.df)
+        self._push(delta, "replace_values", find, replacement, columns, use_regex, case_sensitive, whole_cell)
+        self.hash_index.apply(delta, self.df, undone=False)
+        return message
 
     def delete_rows_by_indices(self, indices: list[int]):
-        initial_rows = len(self.df)
-        self.df.drop(self.df.index[indices], inplace=True)
-        self.df.reset_index(drop=True, inplace=True)
-        rows_removed = initial_rows - len(self.df)
-        return f"移除了 {rows_removed} 行。"
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[indices] = True
+        # Row positions are specific to this table, so this is not a replayable step
+        return self._remove_rows(mask, "移除了 {rows} 行。", reset_index=True)
 
     def delete_columns_by_name(self, columns_to_delete: list):
-        self.df.drop(columns=columns_to_delete, inplace=True)
-        return f"已删除列: {', '.join(columns_to_delete)}"
+        positions = [i for i, col in enumerate(self.df.columns) if col in columns_to_delete]
+        message = f"已删除列: {', '.join(map(str, columns_to_delete))}"
+        delta = ColumnsRemoved(message, positions, self.df.iloc[:, positions])
+        self._push(delta, "delete_columns_by_name", list(columns_to_delete))
+        self.df = delta.redo(self.df)
+        self.hash_index.apply(delta, self.df, undone=False)
+        return message
 
     def update_cell(self, row_index: int, column_name: str, new_value: str):
         try:
-            original_value = self.df.at[row_index, column_name]
+            # Edit a shallow copy (copy-on-write); the frame the preview shows stays as it was
+            self.df = self.df.copy(deep=False)
+            # row_index is a row position; the index may have gaps after rows were dropped
+            row_label = self.df.index[row_index]
+            original_value = self.df.at[row_label, column_name]
+            old_dtype = self.df[column_name].dtype
             # Try to convert new_value to the original data type
             if new_value == "":
-                 self.df.at[row_index, column_name] = None
+                 self.df.at[row_label, column_name] = None
             else:
                 try:
                     # Attempt to cast to original type to maintain data integrity
                     dtype = self.df[column_name].dtype
                     converted_value = dtype.type(new_value)
-                    self.df.at[row_index, column_name] = converted_value
-                except (ValueError, TypeError):
-                    # If casting fails, just assign the string
-                    self.df.at[row_index, column_name] = new_value
+                    self.df.at[row_label, column_name] = converted_value
+                except (ValueError, TypeError, OverflowError):
+                    # If casting fails, just assign the string (widening the column if its dtype rejects it)
+                    try:
+                        self.df.at[row_label, column_name] = new_value
+                    except (ValueError, TypeError):
+                        self.df.at[row_label, column_name] = self._widen_column(column_name, new_value)
 
-            return f"单元格 ({row_index}, {column_name}) 的值已从 '{original_value}' 更新为 '{new_value}'"
+            message = f"单元格 ({row_index}, {column_name}) 的值已从 '{original_value}' 更新为 '{new_value}'"
+            delta = CellEdited(message, row_index, self.df.columns.get_loc(column_name),
+                               original_value, old_dtype, self.df.at[row_label, column_name], self.df[column_name].dtype)
+            self._push(delta)
+            self.hash_index.apply(delta, self.df, undone=False)
+            return message
         except Exception as e:
             return f"更新单元格失败: {e}"
 
-    def export_to_excel(self, file_path: str):
+    def _widen_column(self, column_name, value: str):
+        """
+        Makes column_name able to hold value and returns the value to store. Compacted columns
+        widen as little as possible: categories gain a category, narrow numbers go to 64 bits.
+        """
+        column = self.df[column_name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            self.df[column_name] = column.cat.add_categories([value])
+            return value
+        number = pd.to_numeric(value, errors='coerce')
+        if pd.api.types.is_numeric_dtype(column.dtype) and not pd.api.types.is_bool_dtype(column.dtype) and pd.notna(number):
+            is_int = pd.api.types.is_integer_dtype(column.dtype) and float(number).is_integer()
+            wide = ('Int64' if is_int else 'Float64') if isinstance(column.dtype, pd.api.extensions.ExtensionDtype) else ('int64' if is_int else 'float64')
+            self.df[column_name] = column.astype(wide)
+            return int(number) if is_int else float(number)
+        self.df[column_name] = column.astype(object)
+        return value
+
+    def undo(self):
+        if not self.history.can_undo:
+            return "没有可撤销的操作。"
+        delta, self.df = self.history.undo(self.df)
+        self.hash_index.apply(delta, self.df, undone=True)
+        self._record_change(delta.change(undone=True))
+        return f"已撤销: {delta.description}"
+
+    def redo(self):
+        if not self.history.can_redo:
+            return "没有可重做的操作。"
+        delta, self.df = self.history.redo(self.df)
+        self.hash_index.apply(delta, self.df, undone=False)
+        self._record_change(delta.change(undone=False))
+        return f"已重做: {delta.description}"
+
+    def export_to_excel(self, file_path: str, progress=None, df=None):
+        """
+        Streams the table (or df, a snapshot of it) into a write-only workbook chunk by chunk, so
+        memory stays bounded regardless of the row count. Tables longer than one sheet continue on
+        Sheet2, Sheet3, ... progress(fraction) is called after every chunk and may raise to abort the export.
+        """
+        df = self.df if df is None else df
+        temp_path = f"{file_path}.part"
         try:
-            self.df.to_excel(file_path, index=False)
-            return True, f"成功导出到 {file_path}"
+            writer = ExcelStreamWriter(df.columns)
+            total = len(df)
+            for start in range(0, total, EXPORT_CHUNK_ROWS):
+                writer.append_frame(df.iloc[start:start + EXPORT_CHUNK_ROWS])
+                if progress:
+                    progress(min(start + EXPORT_CHUNK_ROWS, total) / total)
+            writer.save(temp_path)
+            os.replace(temp_path, file_path)
+            return True, f"成功导出到 {file_path}" + (f" (共 {writer.sheets} 个工作表)" if writer.sheets > 1 else "")
+        except JobCancelled:
+            remove_partial(temp_path)
+            raise
         except Exception as e:
+            remove_partial(temp_path)
             return False, f"导出到 Excel 失败: {e}"
 
-    def export_to_csv(self, file_path: str):
+    def export_to_csv(self, file_path: str, progress=None, df=None):
+        df = self.df if df is None else df
+        temp_path = f"{file_path}.part"
         try:
-            self.df.to_csv(file_path, index=False, encoding='utf-8-sig')
+            total = len(df)
+            with open(temp_path, 'w', encoding='utf-8-sig', newline='') as f:
+                for start in range(0, max(total, 1), EXPORT_CHUNK_ROWS):
+                    df.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(f, index=False, header=start == 0)
+                    if progress:
+                        progress(min(start + EXPORT_CHUNK_ROWS, total) / max(total, 1))
+            os.replace(temp_path, file_path)
             return True, f"成功导出到 {file_path}"
+        except JobCancelled:
+            remove_partial(temp_path)
+            raise
         except Exception as e:
-            return False, f"导出到 CSV 失败: {e}" 
\ No newline at end of file
+            remove_partial(temp_path)
+            return False, f"导出到 CSV 失败: {e}"
+
+    def export_to_parquet(self, file_path: str, compression: str = 'zstd', progress=None, df=None):
+        return self._export_columnar(file_path, 'parquet', compression, progress, df)
+
+    def export_to_feather(self, file_path: str, compression: str = 'zstd', progress=None, df=None):
+        return self._export_columnar(file_path, 'feather', compression, progress, df)
+
+    def _export_columnar(self, file_path: str, file_format: str, compression: str, progress, df=None):
+        """
+        Writes the table as Parquet row groups or Feather (Arrow IPC) record batches, one chunk at a time.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            return False, PYARROW_MISSING_MESSAGE
+
+        temp_path = f"{file_path}.part"
+        label = "Parquet" if file_format == 'parquet' else "Feather"
+        try:
+            df = self._arrow_compatible(self.df if df is None else df)
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            if file_format == 'parquet':
+                writer = pq.ParquetWriter(temp_path, schema, compression=compression)
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=None if compression == 'none' else compression)
+                writer = pa.ipc.new_file(temp_path, schema, options=options)
+            with writer:
+                total = len(df)
+                for start in range(0, max(total, 1), EXPORT_CHUNK_ROWS):
+                    chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                    if progress:
+                        progress(min(start + EXPORT_CHUNK_ROWS, total) / max(total, 1))
+            os.replace(temp_path, file_path)
+            return True, f"成功导出到 {file_path}"
+        except JobCancelled:
+            remove_partial(temp_path)
+            raise
+        except Exception as e:
+            remove_partial(temp_path)
+            return False, f"导出到 {label} 失败: {e}"
+
+    def _arrow_compatible(self, df):
+        """
+        Arrow needs string column names and one type per column; cell edits can leave
+        object columns holding mixed values, which are written as text instead.
+        """
+        df = df.rename(columns=str) if not all(isinstance(col, str) for col in df.columns) else df
+        for i, dtype in enumerate(df.dtypes):
+            if dtype == object and pd.api.types.infer_dtype(df.iloc[:, i], skipna=True).startswith('mixed'):
+                column = df.iloc[:, i]
+                df = df.copy(deep=False) if df is self.df else df
+                df.isetitem(i, column.astype(str).where(column.notna()))
+        return df
@@ -0,0 +1,109 @@
+"""
+Find and replace on the text columns of a table.
+
+Every find runs as a vectorized Series.str operation. Arrow-backed strings are matched by Arrow's
+own regex engine only when the pattern is passed as text with inline flags; a compiled pattern or
+case=False sends pandas down a per-cell Python path that is tens of times slower. So build_pattern
+caches the pattern text, and the compiled Python pattern is only the fallback for syntax Arrow
+rejects (and for validating the find up front).
+"""
+import re
+import warnings
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+class FindSpec:
+    """
+    What to find: a literal or a regex, optionally case-sensitive and/or matching whole cells only.
+    """
+    def __init__(self, find: str, use_regex: bool = False, case_sensitive: bool = False, whole_cell: bool = False):
+        self.find = find
+        self.use_regex = use_regex
+        self.case_sensitive = case_sensitive
+        self.whole_cell = whole_cell
+        self.pattern, self.compiled = build_pattern(find, use_regex, case_sensitive, whole_cell)
+
+    @property
+    def plain(self):
+        # Literal and case-sensitive: answered by substring search or equality, no regex at all
+        return not self.use_regex and self.case_sensitive
+
+
+@lru_cache(maxsize=64)
+def build_pattern(find: str, use_regex: bool, case_sensitive: bool, whole_cell: bool):
+    """
+    (pattern text, compiled pattern) for a find. Raises re.error for an invalid regex.
+    """
+    if use_regex:
+        re.compile(find) # So an error's position refers to the find as typed
+    pattern = find if use_regex else re.escape(find)
+    if whole_cell:
+        pattern = f"^(?:{pattern})$"
+    if not case_sensitive:
+        pattern = "(?i)" + pattern
+    return pattern, re.compile(pattern)
+
+
+def is_text_dtype(dtype):
+    return isinstance(dtype, (pd.StringDtype, pd.CategoricalDtype)) or dtype == object
+
+
+def _contains(strings, spec: FindSpec):
+    if spec.plain:
+        matched = strings == spec.find if spec.whole_cell else strings.str.contains(spec.find, regex=False)
+    else:
+        with warnings.catch_warnings():
+            # Groups are normal in a find whose replacement refers to them
+            warnings.filterwarnings("ignore", "This pattern is interpreted as a regular expression", UserWarning)
+            try:
+                matched = strings.str.contains(spec.pattern, regex=True)
+            except Exception:
+                # Some Python-only syntax is rejected by the Arrow regex engine
+                matched = strings.str.contains(spec.compiled)
+    return matched.to_numpy(dtype=bool, na_value=False)
+
+
+def match_cells(column, spec: FindSpec):
+    """
+    Boolean mask of the cells of a text column that contain (or, for whole_cell, are) a match.
+    A categorical column is matched through its categories, so each distinct value is tried once.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        matched = _contains(pd.Series(column.cat.categories.astype(str)), spec)
+        return np.append(matched, False)[column.cat.codes.to_numpy()] # Code -1 (NA) picks the appended False
+    return _contains(column, spec)
+
+
+def replace_text(strings, spec: FindSpec, replacement: str):
+    """
+    strings with every match replaced. In regex mode replacement may refer to groups (\\1, \\g<name>);
+    otherwise it is inserted as is.
+    """
+    if spec.plain and not spec.whole_cell:
+        return strings.str.replace(spec.find, replacement, regex=False)
+    if not spec.use_regex:
+        replacement = replacement.replace('\\', '\\\\')
+    try:
+        return strings.str.replace(spec.pattern, replacement, regex=True)
+    except Exception:
+        return strings.str.replace(spec.compiled, replacement, regex=True)
+
+
+def replacements(column, spec: FindSpec, replacement: str):
+    """
+    (row positions, new values) of the cells of a text column that contain a match. Only the
+    matching cells go through the replace, so a rare find costs little more than counting it.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        categories = pd.Series(column.cat.categories.astype(str))
+        matched = _contains(categories, spec)
+        codes = column.cat.codes.to_numpy()
+        positions = np.flatnonzero(np.append(matched, False)[codes])
+        new_categories = categories.to_numpy(dtype=object)
+        new_categories[matched] = replace_text(categories[matched], spec, replacement).to_numpy(dtype=object)
+        return positions, new_categories[codes[positions]]
+    positions = np.flatnonzero(_contains(column, spec))
+    return positions, replace_text(column.iloc[positions], spec, replacement).to_numpy(dtype=object)
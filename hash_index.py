@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+from undo_history import RowsRemoved, ColumnsRemoved, CellsFilled, CellsReplaced, CellEdited
+
+_SEED = np.uint64(0xCBF29CE484222325)
+_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+def _hash_column(column):
+    return np.array(pd.util.hash_pandas_object(column, index=False), dtype=np.uint64)
+
+
+def _hashes_as_text(dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    return dtype == object
+
+
+def _equal_cells(column, rows, other_rows):
+    a = column.iloc[rows].to_numpy()
+    b = column.iloc[other_rows].to_numpy()
+    return (a == b) | (pd.isna(a) & pd.isna(b))
+
+
+def _split_collisions(keys, df, positions):
+    """
+    keys with the rows that only share a hash with the first row of their group moved to keys of
+    their own. Only rows whose hash repeats are compared, and only in the given columns.
+    """
+    if not positions:
+        return keys
+    members = np.flatnonzero(pd.Series(keys).duplicated(keep=False).to_numpy())
+    if not len(members):
+        return keys
+    codes, _ = pd.factorize(keys[members])
+    _, first = np.unique(codes, return_index=True)
+    firsts = members[first][codes]
+    equal = np.ones(len(members), dtype=bool)
+    for i in positions:
+        equal &= _equal_cells(df.iloc[:, i], members, firsts)
+    if equal.all():
+        return keys
+    # Real collisions are rare enough to group exactly, by the Python values of the rows
+    colliding = members[~equal]
+    rows = pd.Series(list(zip(*(df.iloc[colliding, i].tolist() for i in positions))), dtype=object)
+    groups, _ = pd.factorize(rows)
+    keys = keys.copy()
+    keys[colliding] = (keys[colliding] * _MULTIPLIER) ^ (groups.astype(np.uint64) + np.uint64(1))
+    return keys
+
+
+class RowHashIndex:
+    """
+    64-bit hashes of every cell, one array per column, aligned with the row positions of the
+    model's DataFrame. A column is hashed the first time a key uses it; after that, edits and
+    row removals patch the arrays, so repeated duplicate checks only hash the changed cells.
+    Keys over a column subset combine the per-column hashes, so any subset reuses them.
+    """
+    def __init__(self):
+        self._columns = [] # Hash array per column position, None until first needed
+        self._dtypes = []
+        self._rows = 0
+
+    def reset(self, df):
+        self._columns = [None] * df.shape[1]
+        self._dtypes = [None] * df.shape[1]
+        self._rows = len(df)
+
+    def key_hashes(self, df, positions):
+        """
+        One hash per row over the given column positions. Equal rows always get equal hashes;
+        distinct rows collide with negligible (2^-64) probability, except in object columns, which
+        hash values as text (1 and '1' alike). Rows that share a hash are compared by those columns.
+        """
+        if len(df) != self._rows or df.shape[1] != len(self._columns):
+            self.reset(df) # Out of sync with the frame; start over rather than return wrong keys
+        keys = np.full(len(df), _SEED, dtype=np.uint64)
+        for i in positions:
+            if self._columns[i] is None or self._dtypes[i] != df.dtypes.iloc[i]:
+                self._columns[i] = _hash_column(df.iloc[:, i])
+                self._dtypes[i] = df.dtypes.iloc[i]
+            keys = (keys * _MULTIPLIER) ^ self._columns[i]
+        return _split_collisions(keys, df, [i for i in positions if _hashes_as_text(df.dtypes.iloc[i])])
+
+    def copy(self):
+        """
+        An index that can be updated without changing this one; the hash arrays are shared until replaced.
+        """
+        index = RowHashIndex()
+        index._columns = list(self._columns)
+        index._dtypes = list(self._dtypes)
+        index._rows = self._rows
+        return index
+
+    def update_cells(self, df, column_position, row_positions):
+        hashes = self._columns[column_position]
+        if hashes is None:
+            return
+        if self._dtypes[column_position] != df.dtypes.iloc[column_position]:
+            # The edit widened the column; every hash of it may have changed
+            self._columns[column_position] = None
+            return
+        # A new array, since a copy() of this index may share the old one
+        hashes = hashes.copy()
+        hashes[row_positions] = _hash_column(df.iloc[row_positions, column_position])
+        self._columns[column_position] = hashes
+
+    def remove_rows(self, positions):
+        self._columns = [None if hashes is None else np.delete(hashes, positions) for hashes in self._columns]
+        self._rows -= len(positions)
+
+    def insert_rows(self, rows, positions):
+        """
+        Inverse of remove_rows: rows (a DataFrame) go back to the given final row positions.
+        """
+        total = self._rows + len(rows)
+        inserted = np.zeros(total, dtype=bool)
+        inserted[positions] = True
+        for i, hashes in enumerate(self._columns):
+            if hashes is not None:
+                restored = np.empty(total, dtype=np.uint64)
+                restored[~inserted] = hashes
+                restored[inserted] = _hash_column(rows.iloc[:, i])
+                self._columns[i] = restored
+        self._rows = total
+
+    def remove_columns(self, positions):
+        for position in sorted(positions, reverse=True):
+            del self._columns[position]
+            del self._dtypes[position]
+
+    def insert_columns(self, positions):
+        for position in sorted(positions):
+            self._columns.insert(position, None)
+            self._dtypes.insert(position, None)
+
+    def apply(self, delta, df, undone: bool):
+        """
+        Keeps the index in step with an undo (undone=True) or redo of a history delta.
+        """
+        if isinstance(delta, RowsRemoved):
+            if undone:
+                self.insert_rows(delta.rows, delta.positions)
+            else:
+                self.remove_rows(delta.positions)
+        elif isinstance(delta, ColumnsRemoved):
+            if undone:
+                self.insert_columns(delta.positions)
+            else:
+                self.remove_columns(delta.positions)
+        elif isinstance(delta, CellsFilled):
+            for i, positions in delta.na_positions.items():
+                self.update_cells(df, i, positions)
+        elif isinstance(delta, CellsReplaced):
+            for i, (positions, _, _) in delta.replaced.items():
+                self.update_cells(df, i, positions)
+        elif isinstance(delta, CellEdited):
+            self.update_cells(df, delta.column_position, [delta.row_position])
+        # ColumnsRenamed leaves every hash as it was
@@ -1,19 +1,16 @@
 import json
 import os
 
+SUPPORTED_LANGUAGES = ("zh", "en")
+
 class Translator:
     def __init__(self):
-        self.language_data = {}
+        self.language_data = {} # Only catalogs that have been used are loaded
         self.language = "zh"
         
         # Determine path to translations folder
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.translations_path = os.path.join(base_dir, 'i18n')
-        if not os.path.exists(self.translations_path):
-            os.makedirs(self.translations_path)
-            self._create_default_translations()
-            
-        self._load_language_data()
 
     def _create_default_translations(self):
         zh_translations = {
@@ -125,26 +122,31 @@ class Translator:
         with open(os.path.join(self.translations_path, 'en.json'), 'w', encoding='utf-8') as f:
             json.dump(en_translations, f, ensure_ascii=False, indent=4)
 
-    def _load_language_data(self):
-        for lang_code in ["zh", "en"]:
-            try:
-                with open(os.path.join(self.translations_path, f'{lang_code}.json'), 'r', encoding='utf-8') as f:
-                    self.language_data[lang_code] = json.load(f)
-            except FileNotFoundError:
-                # If a file is missing, it will be created with defaults
-                self._create_default_translations()
-                with open(os.path.join(self.translations_path, f'{lang_code}.json'), 'r', encoding='utf-8') as f:
-                    self.language_data[lang_code] = json.load(f)
+    def _load_language_data(self, lang_code):
+        """
+        Reads one catalog, the first time a string of that language is needed.
+        """
+        try:
+            with open(os.path.join(self.translations_path, f'{lang_code}.json'), 'r', encoding='utf-8') as f:
+                self.language_data[lang_code] = json.load(f)
+        except FileNotFoundError:
+            # If a file is missing, it will be created with defaults
+            os.makedirs(self.translations_path, exist_ok=True)
+            self._create_default_translations()
+            with open(os.path.join(self.translations_path, f'{lang_code}.json'), 'r', encoding='utf-8') as f:
+                self.language_data[lang_code] = json.load(f)
 
     def set_language(self, language_code):
-        if language_code in self.language_data:
+        if language_code in SUPPORTED_LANGUAGES:
             self.language = language_code
         else:
             # Fallback to English if the language is not supported
             self.language = "en"
 
     def get(self, key):
-        return self.language_data.get(self.language, {}).get(key, key)
+        if self.language not in self.language_data:
+            self._load_language_data(self.language)
+        return self.language_data[self.language].get(key, key)
 
 translator = Translator()
 
@@ -0,0 +1,173 @@
+"""
+Timing spans for the operations the UI runs.
+
+Each span records the op name, the input and output table shape, the wall time and the peak
+memory, and is written as one JSON line to a size-rotated log (see setup_timing_log). By
+default the memory figure is the process's resident high-water mark, which costs nothing to
+read: peak_rss_bytes is the peak so far and peak_rss_growth how much this op raised it. An op
+named in the "profile_op" config key is additionally run under cProfile and tracemalloc (both
+slow it down several times); the profile is saved to PROFILE_DIR beside the log and its exact peak of traced
+allocations is recorded as traced_peak_bytes.
+"""
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from job_runner import JobCancelled
+
+TIMING_LOG_FILE = "timings.jsonl"
+TIMING_LOG_MAX_BYTES = 5 * 1024 * 1024
+TIMING_LOG_BACKUPS = 3
+PROFILE_DIR = "profiles"
+_profile_dir = os.path.abspath(PROFILE_DIR) # Moved next to the timing log by setup_timing_log
+
+timing_logger = logging.getLogger("mark_excel.timing")
+timing_logger.propagate = False # JSON lines only go to their own file, never to app.log
+timing_logger.setLevel(logging.INFO)
+
+_tracing_lock = threading.Lock()
+_tracing_spans = 0
+
+
+def setup_timing_log(log_dir, max_bytes=TIMING_LOG_MAX_BYTES, backup_count=TIMING_LOG_BACKUPS):
+    """
+    Writes the timing log, and saves profiles, in log_dir (where app.log is), whatever the current directory later becomes.
+    """
+    global _profile_dir
+    _profile_dir = os.path.join(log_dir, PROFILE_DIR)
+    handler = RotatingFileHandler(os.path.join(log_dir, TIMING_LOG_FILE), maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    timing_logger.addHandler(handler)
+
+
+def peak_rss():
+    """
+    Peak resident memory of the process so far, in bytes (None if the platform does not say).
+    """
+    try:
+        import resource
+    except ImportError:
+        return _peak_working_set()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024 # Linux reports KB, macOS bytes
+
+
+def _peak_working_set():
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+def _shape(df):
+    return (None, None) if df is None else df.shape
+
+
+class TimingSpan:
+    """
+    Context manager timing one op; set_output(df) records the shape of its result.
+    The finished record is kept in self.record and written to the timing log.
+    """
+    def __init__(self, op: str, df=None, profile: bool = False):
+        self.op = op
+        self.rows_in, self.cols_in = _shape(df)
+        self.rows_out = self.cols_out = None
+        self.profile = profile
+        self.record = None
+        self._profiler = None
+
+    def set_output(self, df):
+        self.rows_out, self.cols_out = _shape(df)
+
+    def __enter__(self):
+        self._peak_before = peak_rss()
+        if self.profile:
+            self._start_profiling()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        extra = self._stop_profiling() if self.profile else {}
+        peak = peak_rss()
+        if exc_type is None:
+            status = "ok"
+        else:
+            status = "cancelled" if issubclass(exc_type, JobCancelled) else "error"
+        self.record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "op": self.op,
+            "status": status,
+            "rows_in": self.rows_in, "cols_in": self.cols_in,
+            "rows_out": self.rows_out, "cols_out": self.cols_out,
+            "seconds": round(seconds, 6),
+            "peak_rss_bytes": peak,
+            "peak_rss_growth": None if peak is None or self._peak_before is None else peak - self._peak_before,
+            **extra,
+        }
+        timing_logger.info(json.dumps(self.record, ensure_ascii=False))
+        return False
+
+    def _start_profiling(self):
+        global _tracing_spans
+        with _tracing_lock:
+            if _tracing_spans == 0:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+            _tracing_spans += 1
+        self._traced_before = tracemalloc.get_traced_memory()[0]
+        try:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable() # Only profiles the calling thread, i.e. the op's worker
+        except ValueError:
+            # Another profiler is already active on this interpreter
+            self._profiler = None
+
+    def _stop_profiling(self):
+        global _tracing_spans
+        extra = {}
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(_profile_dir, exist_ok=True)
+            path = os.path.join(_profile_dir, f"{self.op}-{datetime.now():%Y%m%d-%H%M%S}.prof")
+            self._profiler.dump_stats(path)
+            extra["profile"] = path
+            logging.info(f"性能分析已保存: {path} (可用 python -m pstats {path} 查看)")
+        with _tracing_lock:
+            extra["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1] - self._traced_before
+            _tracing_spans -= 1
+            if _tracing_spans == 0:
+                tracemalloc.stop()
+        return extra
+
+    def duration_text(self):
+        """
+        Wall time for the status bar, e.g. "125 ms".
+        """
+        if self.record is None:
+            return ""
+        seconds = self.record["seconds"]
+        return f"{seconds * 1000:.0f} ms" if seconds < 10 else f"{seconds:.1f} s"
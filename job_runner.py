@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, func, label: str, cancellable: bool, on_success, on_error):
+        self.kind = kind
+        self.func = func
+        self.label = label
+        self.cancellable = cancellable
+        self.on_success = on_success
+        self.on_error = on_error
+        self.progress = None # None means indeterminate
+        self.future = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        # Jobs that mutate shared state in place can only be cancelled before they start
+        if self.future is not None and self.future.cancel():
+            self._cancel_event.set()
+        elif self.cancellable:
+            self._cancel_event.set()
+
+    def report_progress(self, fraction: float):
+        """
+        Called from the worker thread. Doubles as a cancellation point for long-running jobs.
+        """
+        if self.cancelled:
+            raise JobCancelled()
+        self.progress = max(0.0, min(1.0, fraction))
+
+
+class JobRunner:
+    """
+    Runs callables on worker threads and delivers their results back on the Tk main loop.
+    Callbacks are only ever invoked from the UI thread via after().
+    """
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, widget, max_workers: int = 2, on_activity=None):
+        self.widget = widget
+        self.on_activity = on_activity
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mark-excel-job")
+        self._results = queue.Queue()
+        self._active = []
+        self._poll_id = None
+
+    def submit(self, kind: str, func, on_success=None, on_error=None, label: str = "", cancellable: bool = True, supersede: bool = False):
+        """
+        Schedules func(job) on a worker thread. With supersede=True every older job of the same kind
+        is cancelled, so only the newest result is ever delivered.
+        """
+        if supersede:
+            self.cancel(kind)
+        job = Job(kind, func, label, cancellable, on_success, on_error)
+        job.future = self._executor.submit(self._run, job)
+        self._active.append(job)
+        self._notify_activity()
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(self.POLL_INTERVAL_MS, self._poll)
+        return job
+
+    def cancel(self, kind: str = None):
+        for job in self._active:
+            if kind is None or job.kind == kind:
+                job.cancel()
+
+    def is_busy(self, *kinds):
+        return any(not job.cancelled and (not kinds or job.kind in kinds) for job in self._active)
+
+    def active_jobs(self):
+        return [job for job in self._active if not job.cancelled]
+
+    def shutdown(self):
+        self.cancel()
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job):
+        if job.cancelled:
+            self._results.put((job, False, None))
+            return
+        try:
+            result = job.func(job)
+            self._results.put((job, True, result))
+        except JobCancelled:
+            self._results.put((job, False, None))
+        except Exception as e:
+            logging.exception(f"后台任务失败: {job.kind}")
+            self._results.put((job, False, e))
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                job, ok, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._active.remove(job)
+            if job.cancelled:
+                continue
+            if ok and job.on_success:
+                job.on_success(payload)
+            elif not ok and payload is not None and job.on_error:
+                job.on_error(payload)
+
+        # Jobs cancelled before they ever started never report back
+        self._active = [job for job in self._active if not (job.cancelled and job.future.cancelled())]
+        self._notify_activity()
+        if self._active:
+            self._poll_id = self.widget.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _notify_activity(self):
+        if self.on_activity:
+            self.on_activity(self.active_jobs())
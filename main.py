@@ -1,25 +1,58 @@
+import time
+_START = time.perf_counter() # Before any other import, so the startup time includes them
+
 import customtkinter as ctk
 from app_view import AppView
-from app_controller import AppController
-from data_model import DataModel
+from i18n import translator
+from instrumentation import setup_timing_log
 from tkinterdnd2 import TkinterDnD
+import json
 import logging
+import os
+import threading
+from logging.handlers import RotatingFileHandler
+
+CONFIG_FILE = "config.json" # AppController.CONFIG_FILE, read here before the controller is imported
+LOG_FILE = "app.log"
+STARTUP_POLL_MS = 20
 
 def setup_logging():
-    """配置日志记录，同时输出到文件和控制台"""
+    """配置日志记录，同时输出到文件和控制台；操作耗时另以 JSON 行写入 timings.jsonl"""
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s',
         handlers=[
-            logging.FileHandler("app.log", encoding='utf-8'),
+            RotatingFileHandler(LOG_FILE, maxBytes=2 * 1024 * 1024, backupCount=3, encoding='utf-8'),
             logging.StreamHandler()
         ]
     )
+    setup_timing_log(os.path.dirname(os.path.abspath(LOG_FILE)))
+
+def configured_language():
+    """只读取配置中的语言，使窗口首次绘制时就只加载这一种语言的翻译"""
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            return json.load(f).get("language", "zh")
+    except (OSError, ValueError):
+        return "zh"
+
+def import_app_modules(modules):
+    """在后台线程中导入 pandas 等重量级模块，窗口在此期间已经显示"""
+    try:
+        import app_controller, data_model
+        modules.update(controller_class=app_controller.AppController, model_class=data_model.DataModel)
+    except Exception:
+        logging.exception("应用模块导入失败")
 
 def main():
     setup_logging()
     logging.info("应用启动")
-    
+
+    # 重量级模块 (pandas 等) 与窗口的创建同时在后台导入
+    modules = {}
+    loader = threading.Thread(target=import_app_modules, args=(modules,), daemon=True)
+    loader.start()
+
     # 1. 创建一个隐藏的、DND-aware的根窗口
     dnd_root = TkinterDnD.Tk()
     dnd_root.withdraw()
@@ -28,30 +61,46 @@ def main():
     root = ctk.CTkToplevel(dnd_root)
     root.title("表格数据整理工具")
     root.geometry("1200x800")
-    
+
     # 设置主题
     ctk.set_appearance_mode("System")
     ctk.set_default_color_theme("blue")
 
-    # 3. 将AppView作为Frame嵌入到主窗口中
+    # 3. 将AppView作为Frame嵌入到主窗口中，先绘制窗口
+    translator.set_language(configured_language())
     view = AppView(master=root)
-    model = DataModel()
-    controller = AppController(model, view)
-    view.set_controller(controller)
+    root.update()
+    window_shown = time.perf_counter() - _START
+    controller = None
+
+    # 4. 模块导入完成后再创建模型与控制器，并加载配置
+    def finish_startup():
+        nonlocal controller
+        if loader.is_alive():
+            dnd_root.after(STARTUP_POLL_MS, finish_startup)
+            return
+        if not modules:
+            return
+        model = modules["model_class"]()
+        controller = modules["controller_class"](model, view)
+        view.set_controller(controller)
+        controller.load_config()
+        logging.info(f"启动耗时: 窗口显示 {window_shown * 1000:.0f} ms, 可以操作 {(time.perf_counter() - _START) * 1000:.0f} ms")
+
+    finish_startup()
 
-    # 4. 加载配置
-    controller.load_config()
-    
     # 5. 定义关闭行为
     def on_closing():
         logging.info("应用关闭")
-        controller.save_config()
+        if controller is not None:
+            controller.save_config()
+            controller.shutdown()
         dnd_root.destroy() # 必须销毁根窗口
 
     root.protocol("WM_DELETE_WINDOW", on_closing)
-    
+
     # 6. 在DND根窗口上运行主循环
     dnd_root.mainloop()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,115 @@
+"""
+Loading several files into one table.
+
+Each file is parsed on its own worker thread with its own encoding and delimiter detection; the
+parsers spend most of their time in pandas/pyarrow code that releases the GIL, and threads hand
+the frames back without pickling them. The frames are then concatenated with their columns
+aligned by name, keeping every column (union) or only those all files share (intersection).
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from data_model import DataModel, compact_parsed
+from utils import detect_delimiter, detect_file_encoding, DELIMITER_MIN_CONFIDENCE
+
+HEAD_CHARS = 64 * 1024
+SOURCE_COLUMN = "source_file"
+
+
+def load_file(input_path: str, settings, model=None):
+    """
+    Parses one text or columnar file with its own encoding and delimiter detection.
+    settings may hold delimiter (fixed for every file; detected per file if missing),
+    default_delimiter (used when the detection is not confident), header_row, skip_rows,
+    quote_char and compact. Returns (success, message, df).
+    """
+    model = model or DataModel()
+    compact = settings.get("compact", False)
+    if model.columnar_format(input_path):
+        return model.parse_columnar_file(input_path, compact=compact)
+    try:
+        encoding = detect_file_encoding(input_path)
+        with open(input_path, 'r', encoding=encoding, errors='replace') as f:
+            head = f.read(HEAD_CHARS)
+    except (OSError, LookupError) as e:
+        return False, f"读取文件失败: {e}", None
+
+    delimiter = settings.get("delimiter")
+    if not delimiter:
+        delimiter, confidence = detect_delimiter(head)
+        if confidence < DELIMITER_MIN_CONFIDENCE and settings.get("default_delimiter"):
+            delimiter = settings["default_delimiter"]
+    return model.parse_file(input_path, encoding, delimiter, settings.get("header_row", 0), settings.get("skip_rows", 0),
+                            settings.get("quote_char", '"'), sample=head, compact=compact)
+
+
+def _source_column_name(columns):
+    name, number = SOURCE_COLUMN, 1
+    while name in columns:
+        number += 1
+        name = f"{SOURCE_COLUMN}_{number}"
+    return name
+
+
+def concat_frames(frames, names, intersection: bool = False, source_column: bool = False):
+    """
+    Concatenates frames with columns aligned by name. Columns keep the order in which they first
+    appear. With source_column, a leading categorical column tells which file (from names, which
+    must be unique) each row came from.
+    """
+    for frame, name in zip(frames, names):
+        if not frame.columns.is_unique:
+            raise ValueError(f"{name} 中有重复的列名，无法按列名对齐。")
+    df = pd.concat(frames, join='inner' if intersection else 'outer', ignore_index=True, sort=False)
+    if source_column:
+        codes = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+        df.insert(0, _source_column_name(df.columns), pd.Categorical.from_codes(codes, categories=names))
+    return df
+
+
+def merge_files(paths, settings, intersection: bool = False, source_column: bool = False, compact: bool = False, max_workers=None, progress=None):
+    """
+    Parses paths in parallel and concatenates them in the order given. A file that fails to
+    parse fails the merge, naming the file. Returns (success, message, df).
+    progress(fraction) is called as files finish.
+    """
+    paths = list(paths)
+    # Compacting per file would give each file its own categories, which concat turns back into objects
+    settings = dict(settings, compact=False)
+    frames = [None] * len(paths)
+    max_workers = max_workers or min(len(paths), os.cpu_count() or 1, 8)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mark-excel-merge") as executor:
+        futures = {executor.submit(load_file, path, settings): number for number, path in enumerate(paths)}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                number = futures[future]
+                success, message, df = future.result()
+                if not success:
+                    for pending in futures:
+                        pending.cancel()
+                    return False, f"{os.path.basename(paths[number])}: {message}", None
+                frames[number] = df
+                if progress:
+                    progress(done / len(paths))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    names = [os.path.basename(path) for path in paths]
+    if len(set(names)) < len(names):
+        names = paths # Same file name in different folders
+    try:
+        df = concat_frames(frames, names, intersection, source_column)
+    except ValueError as e:
+        return False, f"合并失败: {e}", None
+    logging.info(f"已合并 {len(paths)} 个文件: {len(df)} 行, {df.shape[1]} 列")
+    message = f"已合并 {len(paths)} 个文件, 共 {len(df)} 行, {df.shape[1]} 列"
+    if any(not frame.columns.equals(frames[0].columns) for frame in frames):
+        message += " (各文件的列不完全相同，已按列名" + ("取交集" if intersection else "取并集") + ")"
+    df, message = compact_parsed(df, message, compact)
+    return True, message, df
@@ -0,0 +1,27 @@
+import pandas as pd
+
+
+def profile_column(column):
+    """
+    Null count, distinct count, inferred type and min/max of one column, using pandas reductions.
+    """
+    nulls = int(column.isna().sum())
+    stats = {
+        "dtype": str(column.dtype),
+        "inferred": pd.api.types.infer_dtype(column, skipna=True),
+        "nulls": nulls,
+        "distinct": int(column.nunique(dropna=True)),
+        "min": None,
+        "max": None,
+    }
+    if nulls < len(column) and not pd.api.types.is_bool_dtype(column.dtype):
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            values = column.cat.categories[column.cat.codes[column.cat.codes >= 0].unique()]
+        else:
+            values = column
+        try:
+            stats["min"], stats["max"] = values.min(), values.max()
+        except TypeError:
+            # Mixed types that do not compare with each other (e.g. after cell edits)
+            pass
+    return stats
@@ -0,0 +1,157 @@
+"""
+Recordable cleaning recipes.
+
+A recipe is the list of replayable DataModel operations applied to a table, e.g.
+remove_empty_rows -> remove_duplicate_rows -> normalize_column_names -> fill_na_global.
+It can be saved as JSON, replayed on another table without the UI, or applied to a
+whole folder of files:
+
+    python recipes.py recipe.json input_dir output_dir --format csv --workers 4
+"""
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_model import DataModel
+from multi_file import load_file
+
+# DataModel methods that do not depend on row positions of one particular table
+REPLAYABLE_OPS = {
+    "remove_empty_rows",
+    "remove_duplicate_rows",
+    "remove_empty_and_duplicate_rows",
+    "normalize_column_names",
+    "fill_na_global",
+    "replace_values",
+    "delete_columns_by_name",
+}
+INPUT_EXTENSIONS = ('.txt', '.csv', '.tsv', '.md', '.parquet', '.feather', '.arrow')
+RECIPE_VERSION = 1
+
+
+class Recipe:
+    def __init__(self, steps=None):
+        self.steps = [dict(step) for step in steps or [] if step and step.get("op") in REPLAYABLE_OPS]
+
+    @classmethod
+    def from_history(cls, history):
+        return cls(history.steps)
+
+    @classmethod
+    def load(cls, file_path: str):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get("steps", []))
+
+    def save(self, file_path: str):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": RECIPE_VERSION, "steps": self.steps}, f, ensure_ascii=False, indent=4)
+
+    def fused_steps(self):
+        """
+        Merges adjacent steps that can share one pass over the data.
+        """
+        fused = []
+        for step in self.steps:
+            op, args = step["op"], step.get("args", [])
+            previous = fused[-1] if fused else None
+            # Only whole-row, keep-first dedup (recorded without args) fuses with empty-row removal
+            if previous and {previous["op"], op} == {"remove_empty_rows", "remove_duplicate_rows"} and not args and not previous["args"]:
+                fused[-1] = {"op": "remove_empty_and_duplicate_rows", "args": []}
+            elif previous and previous["op"] == "remove_empty_and_duplicate_rows" and op in ("remove_empty_rows", "remove_duplicate_rows") and not args:
+                continue
+            elif previous and op == previous["op"] and op in ("fill_na_global", "normalize_column_names"):
+                # No NA is left after the first fill, and snake_case is idempotent
+                continue
+            elif previous and op == previous["op"] == "delete_columns_by_name":
+                fused[-1] = {"op": op, "args": [previous["args"][0] + [col for col in args[0] if col not in previous["args"][0]]]}
+            else:
+                fused.append({"op": op, "args": list(args)})
+        return fused
+
+    def apply(self, model: DataModel):
+        messages = [getattr(model, step["op"])(*step["args"]) for step in self.fused_steps()]
+        return " ".join(messages) if messages else "清理流程为空，未执行任何操作。"
+
+
+def process_file(input_path: str, output_path: str, steps, settings):
+    """
+    Loads one file, replays the recipe and exports it. Runs inside a worker process.
+    Returns (input_path, success, message).
+    """
+    model = DataModel()
+    success, message, df = load_file(input_path, settings, model)
+    if not success:
+        return input_path, False, message
+    model.set_dataframe(df)
+    try:
+        Recipe(steps).apply(model)
+    except (KeyError, ValueError) as e:
+        # e.g. a dedup subset naming columns this file does not have; the other files go on
+        return input_path, False, f"清理失败: {e!r}"
+
+    export_func = {
+        '.xlsx': model.export_to_excel,
+        '.parquet': model.export_to_parquet,
+        '.feather': model.export_to_feather,
+    }.get(os.path.splitext(output_path)[1].lower(), model.export_to_csv)
+    success, message = export_func(output_path)
+    return input_path, success, message
+
+
+def run_batch(recipe: Recipe, input_dir: str, output_dir: str, output_format: str = 'xlsx', settings=None, max_workers=None, progress=None):
+    """
+    Applies the recipe to every supported file in input_dir, one file per worker process.
+    progress(fraction) is called as files finish. Returns a list of (input_path, success, message).
+    """
+    settings = settings or {}
+    os.makedirs(output_dir, exist_ok=True)
+    inputs = sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir) if name.lower().endswith(INPUT_EXTENSIONS))
+    results = []
+    if not inputs:
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for input_path in inputs:
+            stem = os.path.splitext(os.path.basename(input_path))[0]
+            output_path = os.path.join(output_dir, f"{stem}.{output_format}")
+            futures.append(executor.submit(process_file, input_path, output_path, recipe.steps, settings))
+        try:
+            for future in as_completed(futures):
+                results.append(future.result())
+                if progress:
+                    progress(len(results) / len(futures))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a Mark Excel cleaning recipe on a folder of files.")
+    parser.add_argument("recipe", help="Recipe JSON saved from the app")
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--format", choices=["xlsx", "csv", "parquet", "feather"], default="xlsx")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--delimiter", default=None, help="Defaults to per-file detection")
+    parser.add_argument("--header-row", type=int, default=0)
+    parser.add_argument("--skip-rows", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    settings = {"delimiter": args.delimiter, "header_row": args.header_row, "skip_rows": args.skip_rows}
+    results = run_batch(Recipe.load(args.recipe), args.input_dir, args.output_dir, args.format, settings, args.workers)
+    failures = 0
+    for input_path, success, message in results:
+        logging.info(f"{os.path.basename(input_path)}: {message}")
+        failures += not success
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
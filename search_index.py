@@ -0,0 +1,27 @@
+import re
+
+import numpy as np
+
+
+def build_search_strings(column):
+    """
+    The lowercase display text of a column, built once and cached in DataModel.search_strings.
+    """
+    return column.astype(str).str.lower()
+
+
+def match_rows(strings, query: str, use_regex: bool, rows=None):
+    """
+    Boolean match per row of strings (restricted to the given row positions, if any).
+    Literal queries are matched case-insensitively by lowercasing the query; regexes get (?i).
+    """
+    if rows is not None:
+        strings = strings.iloc[rows]
+    if not use_regex:
+        return strings.str.contains(query.lower(), regex=False).to_numpy(dtype=bool, na_value=False)
+    try:
+        return strings.str.contains(f"(?i){query}", regex=True).to_numpy(dtype=bool, na_value=False)
+    except Exception:
+        # Some Python-only syntax (e.g. lookbehind) is rejected by the Arrow regex engine
+        pattern = re.compile(query, re.IGNORECASE)
+        return np.fromiter((pattern.search(text) is not None for text in strings.tolist()), dtype=bool, count=len(strings))
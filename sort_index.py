@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+
+def build_sort_key(column):
+    """
+    (ranks, missing rank, ascending permutation) of a column, built once and cached in
+    DataModel.sort_keys. Ranks are dense integer codes in sort order; missing values get the
+    missing rank, one past the largest value, so they sort last.
+    """
+    try:
+        codes, uniques = pd.factorize(column, sort=True)
+    except TypeError:
+        # Values that do not compare with each other; fall back to their display text
+        codes, uniques = pd.factorize(column.astype(str), sort=True)
+    ranks = np.where(codes < 0, len(uniques), codes)
+    return ranks, len(uniques), np.argsort(ranks, kind='stable')
+
+
+def _descending(ranks, missing):
+    # Missing values stay last when the order is reversed
+    return np.where(ranks == missing, missing, missing - 1 - ranks)
+
+
+def sort_permutation(keys, ascending):
+    """
+    Stable row order for several sort keys (from build_sort_key), most significant first.
+    A single ascending key reuses its cached permutation without sorting again.
+    """
+    if len(keys) == 1 and ascending[0]:
+        return keys[0][2]
+    columns = [ranks if up else _descending(ranks, missing) for (ranks, missing, _), up in zip(keys, ascending)]
+    if len(columns) == 1:
+        return np.argsort(columns[0], kind='stable')
+    return np.lexsort(columns[::-1])
+
+
+def filter_permutation(permutation, rows, row_count):
+    """
+    The rows of a filter result, in the order of permutation.
+    """
+    keep = np.zeros(row_count, dtype=bool)
+    keep[rows] = True
+    return permutation[keep[permutation]]
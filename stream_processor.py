@@ -0,0 +1,177 @@
+"""
+Out-of-core cleaning for files larger than memory.
+
+The file is read CHUNK_ROWS rows at a time and never held in memory as a whole. The cleaning
+steps are the same {"op", "args"} steps recipes are made of; they are applied chunk by chunk
+and the result is streamed straight to CSV or xlsx. Duplicate rows are found across chunks
+through a set of 64-bit row hashes, which costs memory per distinct row but not per cell.
+"""
+import csv
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_model import ExcelStreamWriter, remove_partial, snake_case, subset_positions
+from find_replace import FindSpec, is_text_dtype, replacements
+from job_runner import JobCancelled
+from recipes import Recipe
+from undo_history import put_values
+
+CHUNK_ROWS = 100000
+
+
+def _read_options(encoding, delimiter, header_row, skip_rows, quote_char):
+    # Every cell stays text: values are written back exactly as read, and a row hashes
+    # the same whichever chunk it lands in, whatever dtype the chunk would have inferred
+    options = dict(sep=delimiter, header=header_row, skiprows=skip_rows, dtype=str,
+                   engine='c' if len(delimiter) == 1 else 'python',
+                   encoding=encoding, encoding_errors='replace', skipinitialspace=True)
+    if quote_char is None:
+        options['quoting'] = csv.QUOTE_NONE
+    else:
+        options['quotechar'] = quote_char
+    return options
+
+
+def read_first_chunk(file_path, encoding, delimiter, header_row, skip_rows, quote_char, chunk_rows=CHUNK_ROWS):
+    """
+    Returns (success, message, df) for the preview: only the first chunk of the file.
+    """
+    try:
+        df = pd.read_csv(file_path, nrows=chunk_rows, **_read_options(encoding, delimiter, header_row, skip_rows, quote_char))
+        return True, f"分块模式: 预览仅显示前 {len(df)} 行，导出时将按块处理整个文件。", df
+    except Exception as e:
+        return False, f"数据解析失败: {e}", None
+
+
+def iter_chunks(file_path, encoding, delimiter, header_row, skip_rows, quote_char, chunk_rows=CHUNK_ROWS, progress=None):
+    """
+    Yields the file as DataFrames of at most chunk_rows rows. progress(fraction) follows the
+    byte position in the file.
+    """
+    with open(file_path, 'rb') as raw:
+        size = max(os.fstat(raw.fileno()).st_size, 1)
+        with pd.read_csv(raw, chunksize=chunk_rows, **_read_options(encoding, delimiter, header_row, skip_rows, quote_char)) as reader:
+            for chunk in reader:
+                yield chunk
+                if progress:
+                    progress(raw.tell() / size)
+
+
+class ChunkCleaner:
+    """
+    Applies recipe steps to one chunk at a time. Row removals are counted in self.removed.
+    """
+    def __init__(self, steps):
+        self.steps = Recipe(steps).fused_steps()
+        self.removed = 0
+        self._seen = {} # Row hashes seen so far, per dedup key subset
+
+    def clean(self, chunk):
+        for step in self.steps:
+            op, args = step["op"], step["args"]
+            if op == "remove_empty_rows":
+                chunk = self._drop(chunk, chunk.isna().all(axis=1).to_numpy())
+            elif op == "remove_duplicate_rows":
+                chunk = self._drop(chunk, self._duplicated(chunk, *args))
+            elif op == "remove_empty_and_duplicate_rows":
+                chunk = self._drop(chunk, chunk.isna().all(axis=1).to_numpy() | self._duplicated(chunk))
+            elif op == "normalize_column_names":
+                chunk.columns = [snake_case(col) for col in chunk.columns]
+            elif op == "fill_na_global":
+                chunk = chunk.fillna(args[0])
+            elif op == "replace_values":
+                chunk = self._replace_values(chunk, *args)
+            elif op == "delete_columns_by_name":
+                chunk = chunk.drop(columns=[col for col in chunk.columns if col in args[0]])
+            else:
+                # A step the export cannot apply must not be dropped silently
+                raise ValueError(f"分块模式不支持此清理步骤: {op}")
+        return chunk
+
+    @staticmethod
+    def _replace_values(chunk, find, replacement, columns=None, use_regex=False, case_sensitive=False, whole_cell=False):
+        # Same column scope and matching as DataModel.replace_values
+        spec = FindSpec(find, use_regex, case_sensitive, whole_cell)
+        chunk = chunk.copy(deep=False)
+        for i in range(chunk.shape[1]):
+            if (columns is None or chunk.columns[i] in columns) and is_text_dtype(chunk.dtypes.iloc[i]):
+                column = chunk.iloc[:, i]
+                positions, new_values = replacements(column, spec, replacement)
+                if len(positions):
+                    chunk.isetitem(i, put_values(column, positions, new_values))
+        return chunk
+
+    def _duplicated(self, chunk, subset=None, keep='first'):
+        """
+        Flags rows seen earlier in this chunk or in any previous one, and remembers the rest.
+        """
+        if keep != 'first':
+            # Which copy is last is only known once the whole file has been read
+            raise ValueError("分块模式下去重只能保留第一条。")
+        if subset is not None:
+            chunk = chunk.iloc[:, subset_positions(chunk.columns, subset)]
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        seen = self._seen.setdefault(None if subset is None else tuple(subset), set())
+        duplicated = pd.Series(hashes).duplicated().to_numpy() | np.fromiter((value in seen for value in hashes.tolist()), dtype=bool, count=len(hashes))
+        seen.update(hashes[~duplicated].tolist())
+        return duplicated
+
+    def _drop(self, chunk, mask):
+        self.removed += int(mask.sum())
+        return chunk[~mask] if mask.any() else chunk
+
+
+def _restore_numbers(chunk):
+    """
+    Chunks are read as text; columns that are entirely numeric go to Excel as numbers.
+    """
+    chunk = chunk.copy(deep=False)
+    for i in range(chunk.shape[1]):
+        column = chunk.iloc[:, i]
+        numbers = pd.to_numeric(column, errors='coerce')
+        if numbers.notna().sum() == column.notna().sum():
+            chunk.isetitem(i, numbers)
+    return chunk
+
+
+def stream_clean_file(file_path, output_path, encoding, delimiter, header_row, skip_rows, quote_char, steps, progress=None):
+    """
+    Cleans file_path chunk by chunk and writes the result to output_path (.xlsx or CSV).
+    Returns (success, message); raises JobCancelled if progress() does.
+    """
+    temp_path = f"{output_path}.part"
+    cleaner = ChunkCleaner(steps)
+    chunks = iter_chunks(file_path, encoding, delimiter, header_row, skip_rows, quote_char, progress=progress)
+    rows = 0
+    try:
+        if output_path.lower().endswith('.xlsx'):
+            writer = None
+            for chunk in chunks:
+                chunk = cleaner.clean(chunk)
+                if writer is None:
+                    writer = ExcelStreamWriter(chunk.columns)
+                writer.append_frame(_restore_numbers(chunk))
+                rows += len(chunk)
+            if writer is None:
+                return False, "分块导出失败: 文件中没有数据。"
+            writer.save(temp_path)
+        else:
+            with open(temp_path, 'w', encoding='utf-8-sig', newline='') as f:
+                for number, chunk in enumerate(chunks):
+                    chunk = cleaner.clean(chunk)
+                    chunk.to_csv(f, index=False, header=number == 0)
+                    rows += len(chunk)
+        os.replace(temp_path, output_path)
+        logging.info(f"分块处理完成: {os.path.basename(file_path)}, 输出 {rows} 行, 移除 {cleaner.removed} 行")
+        return True, f"成功导出到 {output_path} (分块处理, 共 {rows} 行, 移除 {cleaner.removed} 行)"
+    except JobCancelled:
+        chunks.close()
+        remove_partial(temp_path)
+        raise
+    except Exception as e:
+        chunks.close()
+        remove_partial(temp_path)
+        return False, f"分块导出失败: {e}"
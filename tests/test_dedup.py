@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from data_model import DataModel
+from stream_processor import stream_clean_file
+
+
+def test_mixed_int_and_str_values_are_not_duplicates():
+    df = pd.DataFrame({"a": pd.Series([1, "1", 1, "1", "x"], dtype=object), "b": [0, 0, 0, 0, 0]})
+    model = DataModel()
+    model.set_dataframe(df.copy())
+    model.remove_duplicate_rows()
+    expected = df.drop_duplicates().reset_index(drop=True)
+    assert model.df["a"].tolist() == expected["a"].tolist() == [1, "1", "x"]
+
+
+def test_duplicate_groups_keep_int_and_str_apart():
+    df = pd.DataFrame({"a": pd.Series([1, "1", "1", 2], dtype=object)})
+    model = DataModel()
+    model.set_dataframe(df)
+    rows_to_remove, group_count, preview = model.duplicate_groups()
+    assert (rows_to_remove, group_count) == (1, 1)
+    assert preview["a"].tolist() == ["1", "1"]
+
+
+def test_subset_naming_missing_columns_raises_like_drop_duplicates():
+    df = pd.DataFrame({"a": [1, 1, 2, 2]})
+    model = DataModel()
+    model.set_dataframe(df.copy())
+    with pytest.raises(KeyError):
+        df.drop_duplicates(subset=["x"])
+    with pytest.raises(KeyError):
+        model.remove_duplicate_rows(subset=["x"])
+    with pytest.raises(KeyError):
+        model.duplicate_groups(subset=["x", "a"])
+    assert len(model.df) == 4
+
+
+def test_chunked_dedup_subset_naming_missing_columns_raises(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text("a,b\n1,x\n1,y\n", encoding="utf-8")
+    steps = [{"op": "remove_duplicate_rows", "args": [["x"], "first"]}]
+    success, message = stream_clean_file(str(source), str(tmp_path / "out.csv"), "utf-8", ",", 0, 0, '"', steps)
+    assert not success
+    assert "'x'" in message
@@ -0,0 +1,84 @@
+import pytest
+
+from data_model import DataModel
+
+
+@pytest.fixture
+def model():
+    return DataModel()
+
+
+def test_dates_and_times_round_trip_as_typed(model, tmp_path):
+    text = "day,start,count\n2024-01-05,10:30,1\n2024-02-01,09:05:30,2\n"
+    success, _, df = model.parse_string(text, ",", 0, 0, '"')
+    assert success
+    model.set_dataframe(df)
+    path = tmp_path / "out.csv"
+    model.export_to_csv(str(path))
+    assert path.read_bytes() == b"\xef\xbb\xbf" + text.encode() # export_to_csv writes a BOM for Excel
+
+
+def test_dates_past_the_engine_sample_stay_text(model):
+    text = "n,x\n" + "1.5,a\n" * 20000 + "3,2024-01-05 10:30\n"
+    success, _, df = model.parse_string(text, ",", 0, 0, '"')
+    assert success
+    assert df["x"].iloc[-1] == "2024-01-05 10:30"
+
+
+
+def test_integers_beyond_int64_stay_exact(model):
+    success, _, df = model.parse_string("id\n12345678901234567890\n12345678901234567891\n", ",", 0, 0, '"')
+    assert success
+    assert df["id"].tolist() == [12345678901234567890, 12345678901234567891]
+
+
+TABLE = "a,b,c\n1,x,2\n2,y,3\n"
+TEXT_IDS = "id,flag,n\nx01,yes,1\n002,no,2\n"
+
+
+def parse_both(model, base, text, delimiter=","):
+    settings = (delimiter, 0, 0, '"')
+    _, _, previous = model.parse_string(base, *settings)
+    result = model.parse_appended(base, previous, text, *settings)
+    _, _, full = model.parse_string(text, *settings)
+    return result, full
+
+
+@pytest.mark.parametrize("base, tail, delimiter", [
+    (TABLE, "3,z,4\n", ","),
+    (TABLE, ",,\n", ","), # A delimiter-only line is an empty row
+    (TABLE, ",,", ","),
+    (TABLE, "\n", ","),
+    ("a\n1\n2\n", "3\n", ","),
+    ("a\tb\n1\tx\n", "\t\n", "\t"),
+    (TEXT_IDS, "007,true,3\n", ","), # Text columns keep zero padding and 'true' as typed
+    (TEXT_IDS, "1e3,false,4\n", ","),
+])
+def test_appended_lines_parse_like_a_full_parse(model, base, tail, delimiter):
+    result, full = parse_both(model, base, base + tail, delimiter)
+    assert result is not None
+    assert result[2].equals(full)
+    assert result[2].dtypes.tolist() == full.dtypes.tolist()
+
+
+@pytest.mark.parametrize("base, text", [
+    (TABLE, TABLE + "   \n"), # Engines disagree about lines of spaces
+    (TABLE, TABLE + " \n\n"),
+    ("a\n1\n2\n", "a\n1\n2\n   \n"),
+    (TABLE, TABLE + "x\n,\n"), # Short rows do not fit the columns on their own
+    ("a,b\n1,2\n3,x\n", "a,b\n1,2\n"), # Removing the only text made the column numeric
+])
+def test_edits_only_a_full_parse_can_settle_fall_back(model, base, text):
+    result, _ = parse_both(model, base, text)
+    assert result is None
+
+
+def test_cached_parse_is_unchanged_by_edits_to_a_returned_frame(model):
+    text = "a,b\n1,x\n2,y\n"
+    _, _, first = model.parse_string(text, ",", 0, 0, '"')
+    first.iloc[0, 0] = 99
+    first.columns = ["c", "d"]
+    _, message, second = model.parse_string(text, ",", 0, 0, '"')
+    assert "缓存" in message
+    assert list(second.columns) == ["a", "b"]
+    assert second["a"].tolist() == [1, 2]
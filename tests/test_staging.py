@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from data_model import DataModel
+from profiling import profile_column
+from recipes import Recipe
+from search_index import build_search_strings, match_rows
+
+
+def make_model():
+    model = DataModel()
+    model.set_dataframe(pd.DataFrame({"a": [1, 1, 2, None], "b": ["x", "x", "y", None]}))
+    return model
+
+
+def test_failed_operation_leaves_table_history_and_hashes_untouched():
+    model = make_model()
+    before = model.df
+    # The second step is missing its fill value, so the recipe fails after the first one ran
+    recipe = Recipe([{"op": "remove_duplicate_rows", "args": []}, {"op": "fill_na_global", "args": []}])
+    with pytest.raises(TypeError):
+        model.run_staged(recipe.apply, model)
+    assert model.df is before
+    assert not model.history.can_undo
+    assert model.history.steps == []
+    model.remove_duplicate_rows()
+    assert len(model.df) == 3
+    model.undo()
+    assert model.df.equals(before)
+
+
+def test_staged_operation_applies_on_commit():
+    model = make_model()
+    before = model.df
+    message, state = model.run_staged(model.remove_duplicate_rows)
+    assert model.df is before and not model.history.can_undo
+    model.commit(state)
+    assert len(model.df) == 3
+    assert state.last_change.rows_removed.tolist() == [1]
+    model.undo()
+    assert model.df.equals(before)
+
+
+def test_search_text_built_during_an_operation_is_dropped_on_commit():
+    model = DataModel()
+    model.set_dataframe(pd.DataFrame({"fruit": ["apple", "pear"]}))
+    message, state = model.run_staged(model.replace_values, "apple", "kiwi")
+    # The UI searches the committed table while the operation is still running
+    model.search_strings.sync(1)
+    strings, token = model.search_strings.get(0)
+    assert model.search_strings.put(token, build_search_strings(model.df.iloc[:, 0])) == 0
+    model.commit(state)
+    strings, token = model.search_strings.get(0)
+    assert strings is None
+    assert match_rows(build_search_strings(model.df.iloc[:, 0]), "kiwi", False).tolist() == [True, False]
+
+
+def test_profile_built_during_an_operation_is_dropped_on_commit():
+    model = DataModel()
+    model.set_dataframe(pd.DataFrame({"n": [1.0, None, 3.0], "s": ["a", "b", "c"]}))
+    message, state = model.run_staged(model.fill_na_global, "0")
+    # The profile panel asks for the committed table's stats while the fill is still running
+    model.profiles.sync(2)
+    stale = {position: model.profiles.get(position)[1] for position in range(2)}
+    for position, token in stale.items():
+        model.profiles.put(token, profile_column(model.df.iloc[:, position]))
+    model.commit(state)
+    assert model.profiles.get(0)[0] is None # Filled, so profiled again from the new frame
+    assert model.profiles.get(1)[0] is not None # Untouched, so the stats still hold
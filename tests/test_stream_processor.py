@@ -0,0 +1,24 @@
+import pandas as pd
+
+from data_model import DataModel
+from stream_processor import read_first_chunk, stream_clean_file
+
+
+def test_chunked_export_applies_replace_values(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text("name,code\nFoo,x-1\nfoo,x-2\nbar,y\n", encoding="utf-8")
+    settings = ("utf-8", ",", 0, 0, '"')
+    steps = [
+        {"op": "replace_values", "args": ["foo", "baz", ["name"], False, False, True]},
+        {"op": "replace_values", "args": [r"x-(\d)", r"\1", None, True, True, False]},
+    ]
+    output = tmp_path / "out.csv"
+    success, message = stream_clean_file(str(source), str(output), *settings, steps)
+    assert success, message
+
+    # The preview of a chunked file replays the same steps on its first chunk
+    model = DataModel()
+    model.set_dataframe(read_first_chunk(str(source), *settings)[2])
+    for step in steps:
+        model.replace_values(*step["args"])
+    assert pd.read_csv(output, dtype=str, encoding="utf-8-sig").equals(model.df)
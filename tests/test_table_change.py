@@ -0,0 +1,40 @@
+import pandas as pd
+
+from data_model import DataModel
+
+
+def make_model(df):
+    model = DataModel()
+    model.set_dataframe(df)
+    model.last_change = None
+    return model
+
+
+def test_widening_cell_edit_reports_whole_column():
+    model = make_model(pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}))
+    model.update_cell(0, "a", "2.5")
+    assert model.df["a"].tolist() == [2.5, 2.0, 3.0]
+    assert model.last_change.cells == {0: None}
+    model.last_change = None
+    model.undo()
+    assert model.last_change.cells == {0: None}
+
+
+def test_cell_edit_keeping_dtype_reports_only_that_cell():
+    model = make_model(pd.DataFrame({"a": [1, 2, 3]}))
+    model.update_cell(1, "a", "7")
+    assert model.last_change.cells[0].tolist() == [1]
+
+
+def test_fill_reports_whole_column_only_where_dtype_changed():
+    model = make_model(pd.DataFrame({"n": [1, None, 3], "s": ["x", None, "z"]}))
+    model.fill_na_global("0")
+    assert model.df["n"].dtype != "float64"
+    assert model.last_change.cells[0] is None
+    assert model.last_change.cells[1].tolist() == [1]
+
+
+def test_replace_keeping_dtype_reports_replaced_cells():
+    model = make_model(pd.DataFrame({"s": ["ab", "cd", "ab"]}))
+    model.replace_values("ab", "x")
+    assert model.last_change.cells[0].tolist() == [0, 2]
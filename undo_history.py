@@ -0,0 +1,324 @@
+import sys
+import numpy as np
+import pandas as pd
+from collections import deque
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def fill_column(column, value):
+    """
+    fillna that never fails on a narrow dtype: categories gain the fill value,
+    other dtypes that reject it fall back to object.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+        column = column.cat.add_categories([value])
+    try:
+        return column.fillna(value)
+    except (TypeError, ValueError):
+        return column.astype(object).fillna(value)
+
+
+def put_values(column, positions, values):
+    """
+    column with values written at the row positions. Categories gain the new values;
+    other dtypes that reject them fall back to object.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        missing = pd.Index(values).dropna().unique().difference(column.cat.categories)
+        if len(missing):
+            column = column.cat.add_categories(missing)
+    column = column.copy()
+    try:
+        column.iloc[positions] = values
+    except (TypeError, ValueError):
+        column = column.astype(object)
+        column.iloc[positions] = values
+    return column
+
+
+def _object_nbytes(values, sample: int = 1000):
+    """
+    Estimated size of an object array, extrapolated from its first values.
+    """
+    if not len(values):
+        return 0
+    head = values[:sample]
+    return values.nbytes + sum(map(sys.getsizeof, head)) * len(values) // len(head)
+
+
+def _reinsert_rows(df, rows, positions):
+    """
+    Inverse of dropping `rows` from the given row positions of the original frame.
+    """
+    total = len(df) + len(rows)
+    removed = np.zeros(total, dtype=bool)
+    removed[positions] = True
+    order = np.empty(total, dtype=np.intp)
+    order[~removed] = np.arange(len(df))
+    order[removed] = len(df) + np.arange(len(rows))
+    return pd.concat([df, rows]).take(order)
+
+
+class TableChange:
+    """
+    What an operation did to the table, in row/column positions, so the preview can patch
+    only the affected items. full=True means anything may have changed.
+    """
+    def __init__(self, cells=None, rows_removed=None, rows_inserted=None, columns_removed=None, columns_inserted=None, columns_renamed=False, full=False):
+        self.cells = cells or {} # {column position: row positions, or None for every row (e.g. the column's dtype changed)}
+        self.rows_removed = rows_removed
+        self.rows_inserted = rows_inserted
+        self.columns_removed = columns_removed
+        self.columns_inserted = columns_inserted
+        self.columns_renamed = columns_renamed
+        self.full = full
+
+    @property
+    def columns_changed(self):
+        return self.columns_removed is not None or self.columns_inserted is not None or self.columns_renamed
+
+
+def _retyped_columns(cells, old_dtypes, new_dtypes):
+    # A column whose dtype changed may read differently in every row, not just the touched ones
+    return {i: positions if new_dtypes.get(i, old_dtypes[i]) == old_dtypes[i] else None for i, positions in cells.items()}
+
+
+class RowsRemoved:
+    def __init__(self, description, positions, rows, old_index=None):
+        self.description = description
+        self.positions = positions
+        self.rows = rows
+        self.old_index = old_index # Only kept when the operation renumbered the index
+        self.nbytes = frame_nbytes(rows) + positions.nbytes + (0 if old_index is None else old_index.memory_usage(deep=True))
+
+    def undo(self, df):
+        df = _reinsert_rows(df, self.rows, self.positions)
+        if self.old_index is not None:
+            df.index = self.old_index
+        return df
+
+    def redo(self, df):
+        keep = np.ones(len(df), dtype=bool)
+        keep[self.positions] = False
+        df = df.take(np.flatnonzero(keep))
+        return df.reset_index(drop=True) if self.old_index is not None else df
+
+    def change(self, undone):
+        return TableChange(rows_inserted=self.positions) if undone else TableChange(rows_removed=self.positions)
+
+
+class ColumnsRemoved:
+    def __init__(self, description, positions, columns):
+        self.description = description
+        self.positions = positions
+        self.columns = columns
+        self.nbytes = frame_nbytes(columns)
+
+    def undo(self, df):
+        df = df.copy(deep=False)
+        for i, position in enumerate(self.positions):
+            df.insert(position, self.columns.columns[i], self.columns.iloc[:, i], allow_duplicates=True)
+        return df
+
+    def redo(self, df):
+        keep = np.ones(df.shape[1], dtype=bool)
+        keep[self.positions] = False
+        return df.take(np.flatnonzero(keep), axis=1)
+
+    def change(self, undone):
+        return TableChange(columns_inserted=self.positions) if undone else TableChange(columns_removed=self.positions)
+
+
+class ColumnsRenamed:
+    def __init__(self, description, old_columns, new_columns):
+        self.description = description
+        self.old_columns = list(old_columns)
+        self.new_columns = list(new_columns)
+        self.nbytes = 0
+
+    def undo(self, df):
+        return df.set_axis(self.old_columns, axis=1)
+
+    def redo(self, df):
+        return df.set_axis(self.new_columns, axis=1)
+
+    def change(self, undone):
+        return TableChange(columns_renamed=True)
+
+
+class CellsFilled:
+    def __init__(self, description, fill_value, na_positions, old_dtypes):
+        self.description = description
+        self.fill_value = fill_value
+        self.na_positions = na_positions # {column position: row positions that were NA}
+        self.old_dtypes = old_dtypes
+        self.new_dtypes = {} # Recorded by redo
+        self.nbytes = sum(positions.nbytes for positions in na_positions.values())
+
+    def undo(self, df):
+        df = df.copy(deep=False)
+        for i, positions in self.na_positions.items():
+            mask = np.zeros(len(df), dtype=bool)
+            mask[positions] = True
+            restored = df.iloc[:, i].mask(mask)
+            try:
+                restored = restored.astype(self.old_dtypes[i])
+            except (ValueError, TypeError):
+                pass
+            df.isetitem(i, restored)
+        return df
+
+    def redo(self, df):
+        df = df.copy(deep=False)
+        for i, positions in self.na_positions.items():
+            df.isetitem(i, fill_column(df.iloc[:, i], self.fill_value))
+            self.new_dtypes[i] = df.dtypes.iloc[i]
+        return df
+
+    def change(self, undone):
+        return TableChange(cells=_retyped_columns(self.na_positions, self.old_dtypes, self.new_dtypes))
+
+
+class CellsReplaced:
+    def __init__(self, description, replaced, old_dtypes):
+        self.description = description
+        self.replaced = replaced # {column position: (row positions, old values, new values)}
+        self.old_dtypes = old_dtypes
+        self.new_dtypes = {} # Recorded by redo
+        self.nbytes = sum(positions.nbytes + _object_nbytes(old) + _object_nbytes(new) for positions, old, new in replaced.values())
+
+    def undo(self, df):
+        df = df.copy(deep=False)
+        for i, (positions, old, _) in self.replaced.items():
+            restored = put_values(df.iloc[:, i], positions, old)
+            try:
+                restored = restored.astype(self.old_dtypes[i]) # Drops the categories the replace added
+            except (ValueError, TypeError):
+                pass
+            df.isetitem(i, restored)
+        return df
+
+    def redo(self, df):
+        df = df.copy(deep=False)
+        for i, (positions, _, new) in self.replaced.items():
+            df.isetitem(i, put_values(df.iloc[:, i], positions, new))
+            self.new_dtypes[i] = df.dtypes.iloc[i]
+        return df
+
+    def change(self, undone):
+        cells = {i: positions for i, (positions, _, _) in self.replaced.items()}
+        return TableChange(cells=_retyped_columns(cells, self.old_dtypes, self.new_dtypes))
+
+
+class CellEdited:
+    def __init__(self, description, row_position, column_position, old_value, old_dtype, new_value, new_dtype):
+        self.description = description
+        self.row_position = row_position
+        self.column_position = column_position
+        self.old_value, self.old_dtype = old_value, old_dtype
+        self.new_value, self.new_dtype = new_value, new_dtype
+        self.nbytes = 0
+
+    def _set(self, df, value, dtype):
+        df = df.copy(deep=False)
+        if df.dtypes.iloc[self.column_position] == dtype:
+            try:
+                df.iat[self.row_position, self.column_position] = value
+                return df
+            except (ValueError, TypeError):
+                pass
+        column = df.iloc[:, self.column_position].astype(object)
+        column.iloc[self.row_position] = value
+        try:
+            column = column.astype(dtype)
+        except (ValueError, TypeError):
+            pass
+        df.isetitem(self.column_position, column)
+        return df
+
+    def undo(self, df):
+        return self._set(df, self.old_value, self.old_dtype)
+
+    def redo(self, df):
+        return self._set(df, self.new_value, self.new_dtype)
+
+    def change(self, undone):
+        # Widening the column (int to float, say) changes how every row of it reads
+        rows = np.array([self.row_position]) if self.old_dtype == self.new_dtype else None
+        return TableChange(cells={self.column_position: rows})
+
+
+class UndoHistory:
+    """
+    Undo/redo stacks of compact deltas (removed rows, NA positions, old cell values)
+    rather than full DataFrame copies. Once the deltas exceed budget_bytes the oldest
+    undo entries are evicted first.
+
+    Deltas return a new frame from undo/redo instead of changing the one passed in, which
+    the preview may still be showing (shallow copies, so copy-on-write keeps this cheap).
+
+    Alongside the deltas it keeps the applied operation steps ({"op", "args"}), which
+    are tiny and survive eviction; they are what cleaning recipes are recorded from.
+    """
+    def __init__(self, budget_bytes: int = 256 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._undo = deque()
+        self._redo = []
+        self.steps = []
+        self._undone_steps = []
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def push(self, delta, step=None):
+        self._undo.append(delta)
+        self._redo.clear()
+        self.steps.append(step)
+        self._undone_steps.clear()
+        self._enforce_budget()
+
+    def undo(self, df):
+        delta = self._undo.pop()
+        self._redo.append(delta)
+        self._undone_steps.append(self.steps.pop())
+        return delta, delta.undo(df)
+
+    def redo(self, df):
+        delta = self._redo.pop()
+        self._undo.append(delta)
+        self.steps.append(self._undone_steps.pop())
+        return delta, delta.redo(df)
+
+    def copy(self):
+        """
+        A history with the same entries that can be pushed to, undone and redone without changing this one.
+        """
+        history = UndoHistory(self.budget_bytes)
+        history._undo = deque(self._undo)
+        history._redo = list(self._redo)
+        history.steps = list(self.steps)
+        history._undone_steps = list(self._undone_steps)
+        return history
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.steps.clear()
+        self._undone_steps.clear()
+
+    def set_budget(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._enforce_budget()
+
+    def _enforce_budget(self):
+        used = sum(delta.nbytes for delta in self._undo) + sum(delta.nbytes for delta in self._redo)
+        while self._undo and used > self.budget_bytes:
+            used -= self._undo.popleft().nbytes
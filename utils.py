@@ -1,28 +1,122 @@
 import customtkinter as ctk
+import codecs
 import csv
+import hashlib
+import os
+import re
+from collections import Counter, OrderedDict
 from io import StringIO
 
-def detect_delimiter(text_data, max_lines=20):
+DELIMITER_CANDIDATES = ['\t', ',', '|', ';']
+DELIMITER_SAMPLE_CHARS = 32 * 1024
+DELIMITER_MIN_CONFIDENCE = 0.8 # Below this a detected delimiter is never applied automatically
+DELIMITER_CACHE_SIZE = 32
+_delimiter_cache = OrderedDict()
+ENCODING_CHUNK_BYTES = 64 * 1024
+ENCODING_MAX_SAMPLE_BYTES = 2 * 1024 * 1024
+_encoding_cache = {}
+MARKDOWN_ALIGNMENT_ROW = r'^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$'
+_markdown_alignment_re = re.compile(MARKDOWN_ALIGNMENT_ROW)
+
+def detect_delimiter(text_data, sample_size=DELIMITER_SAMPLE_CHARS, max_lines=50):
+    """
+    Scores each candidate delimiter by how consistent the column count is across a
+    bounded sample of the input. Returns (delimiter, confidence between 0 and 1).
+    Only the first sample_size characters are ever looked at, and results are cached
+    per input fingerprint.
+    """
+    sample = text_data[:sample_size]
+    if len(text_data) > sample_size and '\n' in sample:
+        sample = sample[:sample.rindex('\n')] # Never score a cut-off line
+    fingerprint = (len(text_data), hashlib.blake2b(sample.encode('utf-8', 'surrogatepass'), digest_size=16).digest())
+    if fingerprint in _delimiter_cache:
+        _delimiter_cache.move_to_end(fingerprint)
+        return _delimiter_cache[fingerprint]
+
+    if is_markdown_table(sample):
+        result = ('|', 1.0)
+    else:
+        lines = [line for line in sample.splitlines() if line.strip()][:max_lines]
+        scores = []
+        for candidate in DELIMITER_CANDIDATES:
+            counts = Counter(len(row) for row in csv.reader(lines, delimiter=candidate))
+            columns, hits = counts.most_common(1)[0] if counts else (0, 0)
+            consistency = hits / len(lines) if columns > 1 else 0.0
+            scores.append((consistency, columns, candidate))
+        scores.sort(reverse=True)
+        (best, columns, delimiter), runner_up = scores[0], scores[1]
+        confidence = best
+        if runner_up[:2] == (best, columns):
+            confidence /= 2 # Two delimiters explain the sample equally well
+        if len(lines) < 2:
+            confidence /= 2
+        result = (delimiter if best > 0 else ',', confidence)
+
+    _delimiter_cache[fingerprint] = result
+    if len(_delimiter_cache) > DELIMITER_CACHE_SIZE:
+        _delimiter_cache.popitem(last=False)
+    return result
+
+def is_markdown_table(text_data, max_lines=20):
+    """
+    Recognizes a pipe table: rows containing '|' plus a |---|:---:| alignment row.
+    Only the first max_lines non-empty lines are inspected.
     """
-    Intelligently detects the delimiter for a given text data.
+    lines = []
+    for line in StringIO(text_data):
+        if line.strip():
+            lines.append(line)
+            if len(lines) >= max_lines:
+                break
+    if len(lines) < 2 or not any('|' in line for line in lines):
+        return False
+    return any('-' in line and _markdown_alignment_re.match(line) for line in lines)
+
+def detect_file_encoding(file_path, chunk_size=ENCODING_CHUNK_BYTES, max_bytes=ENCODING_MAX_SAMPLE_BYTES):
+    """
+    Feeds the file to chardet chunk by chunk until it is confident (or max_bytes were seen).
+    Results are cached per (path, mtime, size). Returns a normalized codec name.
     """
+    stat = os.stat(file_path)
+    cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    if cache_key in _encoding_cache:
+        return _encoding_cache[cache_key]
+
+    import chardet # Only needed once a file is dropped, so not imported at startup
+    detector = chardet.UniversalDetector()
+    fed = 0
+    with open(file_path, 'rb') as f:
+        while not detector.done and fed < max_bytes:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            detector.feed(chunk)
+            fed += len(chunk)
+    encoding = detector.close().get('encoding') or 'utf-8'
+    if encoding.lower() == 'ascii':
+        encoding = 'utf-8' # Any later non-ASCII byte is far more likely UTF-8 than an error
     try:
-        # Use a small sample of the data to perform detection
-        sniffer = csv.Sniffer()
-        sample = "\n".join(text_data.splitlines()[:max_lines])
-        delimiter = sniffer.sniff(sample).delimiter
-        return delimiter
-    except csv.Error:
-        # Fallback for when sniffer fails (e.g., single column data)
-        if '\t' in sample:
-            return '\t'
-        if '|' in sample:
-            return '|'
-        if ';' in sample:
-            return ';'
-        if ',' in sample:
-            return ','
-        return ',' # Default fallback
+        encoding = codecs.lookup(encoding).name
+    except LookupError:
+        encoding = 'utf-8'
+    _encoding_cache[cache_key] = encoding
+    return encoding
+
+def format_preview_rows(df, start, stop, order=None):
+    """
+    Formats rows [start, stop) of a DataFrame as display strings, one column at a time.
+    With an order (an array of row positions), start and stop index into the order instead.
+    """
+    window = df.iloc[start:stop] if order is None else df.iloc[order[start:stop]]
+    columns = [window.iloc[:, i].astype(str).tolist() for i in range(window.shape[1])]
+    return list(zip(*columns))
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
 
 class Tooltip:
     def __init__(self, widget, text, show_delay=400, hide_delay=100):